@@ -0,0 +1,340 @@
+import re
+from collections import OrderedDict
+
+from port.block_file import BlockFile, CountingFile
+from port.zip_directory import ZipDirectory
+
+############################
+# Archive session shared by all processing steps
+############################
+
+
+class MemberIndex:
+    """Lookup tables over the member names of an archive
+
+    Built once from the central directory so that resolving a pattern from an
+    extraction_dict is a dictionary lookup instead of a scan over all members.
+    All lists keep the archive order of the members.
+
+    Attributes:
+        by_basename: file name without directories -> member names
+        by_directory: directory path ("" for the root) -> member names
+        by_suffix: every trailing path of a member, with and without its
+            extension -> member names. "content/reels" finds
+            "your_instagram_activity/content/reels.json"
+    """
+
+    __slots__ = "by_basename", "by_directory", "by_suffix"
+
+    def __init__(self, names):
+        self.by_basename = {}
+        self.by_directory = {}
+        self.by_suffix = {}
+
+        for name in names:
+            if not name or name.endswith("/"):
+                continue  # directory entries
+
+            directory, _, basename = name.rpartition("/")
+            self.by_basename.setdefault(basename, []).append(name)
+            self.by_directory.setdefault(directory, []).append(name)
+
+            paths = [name]
+            stem, dot, _ = basename.rpartition(".")
+            if dot and stem:
+                paths.append(name[: len(name) - len(basename)] + stem)
+
+            for path in paths:
+                parts = path.split("/")
+                for i in range(len(parts)):
+                    self.by_suffix.setdefault("/".join(parts[i:]), []).append(name)
+
+    def lookup(self, pattern, extension=None):
+        """
+        Return the members whose path ends with pattern at a directory boundary,
+        optionally restricted to members with the given extension (e.g. ".json")
+        """
+        names = self.by_suffix.get(pattern.strip("/"), [])
+        if extension is not None:
+            names = [name for name in names if name.endswith(extension)]
+        return names
+
+
+def resolve_manifest(archive, extraction_dict, extension=None, substrings=True):
+    """
+    Resolve the members every extraction_dict entry will read, before any decompression
+
+    Patterns are first looked up in the archive's MemberIndex. With substrings=True,
+    the patterns the index cannot resolve are matched as plain substrings of the member
+    names, all together in a single walk over the member list.
+
+    Parameters:
+    - archive: ArchiveSession of the uploaded zip file
+    - extraction_dict: extraction dictionary of the platform
+    - extension: only consider members with this extension (e.g. ".json")
+    - substrings: fall back to substring matching for unresolved patterns
+
+    Returns:
+    - dict mapping each entry key to a list of (pattern, member name) pairs, in the
+      order the members should be tried. Entries without any match map to []
+    """
+    index = archive.index
+    resolved = {}
+    for key, entry in extraction_dict.items():
+        for pattern in entry.get("patterns", [key]):
+            if pattern not in resolved:
+                resolved[pattern] = list(index.lookup(pattern, extension))
+
+    unresolved = [pattern for pattern, names in resolved.items() if not names]
+    if substrings and unresolved:
+        # One pass over all members; the combined expression only prefilters the
+        # names, the exact patterns are checked for the few names that pass
+        matcher = re.compile("|".join(re.escape(pattern) for pattern in unresolved))
+        for name in archive.namelist():
+            if name.endswith("/"):
+                continue  # directory entries
+            if extension is not None and not name.endswith(extension):
+                continue
+            if matcher.search(name):
+                for pattern in unresolved:
+                    if pattern in name:
+                        resolved[pattern].append(name)
+
+    return {
+        key: [
+            (pattern, name)
+            for pattern in entry.get("patterns", [key])
+            for name in resolved[pattern]
+        ]
+        for key, entry in extraction_dict.items()
+    }
+
+
+def member_offset(archive, name):
+    """Offset of the member's local header, i.e. where reading it starts"""
+    return archive.getinfo(name).header_offset
+
+
+def schedule_manifest(archive, manifest):
+    """
+    Order the entries of a manifest so that their members are read in one forward
+    sweep over the archive
+
+    Entries are sorted by the lowest local-header offset among their members.
+    Entries without members come first, in manifest order; they read nothing.
+
+    Returns:
+    - list of the manifest keys in reading order
+    """
+
+    def first_offset(key):
+        members = manifest[key]
+        if not members:
+            return -1
+        return min(member_offset(archive, name) for _, name in members)
+
+    return sorted(manifest, key=first_offset)
+
+
+_MISSING = object()
+
+
+class MemberCache:
+    """Parsed members kept in memory, least recently used evicted first
+
+    Values are keyed by (member name, parser), so parsing a member another way
+    does not return the value of the first parser. Values derived from several
+    members are keyed by (member names, function).
+
+    Attributes:
+        max_bytes: ceiling for the estimated size of all cached values
+        size: estimated size of the cached values in bytes
+        hits: number of lookups answered from the cache
+        misses: number of lookups that had to parse the member
+    """
+
+    __slots__ = "max_bytes", "size", "hits", "misses", "_entries"
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (value, size)
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value, size):
+        """Cache value unless it alone exceeds the ceiling, evicting as needed"""
+        if size > self.max_bytes:
+            return
+        self.discard(key)
+        self._entries[key] = (value, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+
+    def discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+
+def parsed_size(value, default):
+    """Estimated memory of a parsed member: exact for DataFrames, else default"""
+    if hasattr(value, "memory_usage"):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    return default
+
+
+class ArchiveSession:
+    """Handle on an uploaded ZIP file that is shared by every processing step
+
+    The ZIP file is opened on first use and kept open until `close` is called,
+    so its central directory is parsed exactly once per upload instead of once
+    for platform identification, once for validation and once per
+    extraction_dict entry.
+
+    Only members with an extension some platform reads or checks are indexed
+    (see port.zip_directory), so photos and videos never get an entry. The
+    upload is read through a BlockFile, which turns many small reads into a few
+    large block reads on the WORKERFS mount. The reads that reach the file are
+    counted and reported when the session is closed.
+
+    Members read by several extraction_dict entries (marked with `share`) are
+    parsed once through `read` and kept in a MemberCache.
+
+    Attributes:
+        filename: path to the uploaded zip file
+        counter: CountingFile over the uploaded file, None until it is opened
+        cache: MemberCache of parsed shared members
+    """
+
+    __slots__ = "filename", "counter", "cache", "_directory", "_index", "_shared"
+
+    def __init__(self, filename, cache_bytes=64 << 20):
+        self.filename = filename
+        self.counter = None
+        self.cache = MemberCache(cache_bytes)
+        self._directory = None
+        self._index = None
+        self._shared = set()
+
+    @property
+    def directory(self):
+        """Open ZipDirectory, raises zipfile.BadZipFile for invalid uploads"""
+        if self._directory is None:
+            self.counter = CountingFile(open(self.filename, "rb", buffering=0))
+            block_file = BlockFile(self.counter)
+            try:
+                self._directory = ZipDirectory(block_file)
+            except Exception:
+                block_file.close()
+                raise
+            print(
+                f"{self.filename}: indexed {len(self._directory.names)} of "
+                f"{self._directory.total} members"
+            )
+        return self._directory
+
+    def namelist(self):
+        """Names of the indexed members, in archive order"""
+        return self.directory.names
+
+    @property
+    def index(self):
+        """MemberIndex over the indexed member names, built on first use"""
+        if self._index is None:
+            self._index = MemberIndex(self.namelist())
+        return self._index
+
+    def infolist(self):
+        return self.directory.infolist()
+
+    def getinfo(self, name):
+        return self.directory.getinfo(name)
+
+    def open(self, name):
+        return self.directory.open(name)
+
+    @property
+    def read_seconds(self):
+        """Time spent reading and decompressing members since the upload was opened"""
+        if self._directory is None:
+            return 0.0
+        return self._directory.read_seconds
+
+    def share(self, names):
+        """Mark members that are read more than once, so `read` caches them"""
+        self._shared.update(names)
+
+    def read(self, name, parser):
+        """
+        Return parser(stream) for the member, parsing shared members only once per
+        parser. Parsers are told apart by identity, so pass the same function
+        object (not a new lambda) to reuse a cached value.
+
+        The cached value is handed to every caller, so callers must not modify it.
+        """
+        if name not in self._shared:
+            with self.open(name) as stream:
+                return parser(stream)
+
+        value = self.cache.get((name, parser), _MISSING)
+        if value is _MISSING:
+            with self.open(name) as stream:
+                value = parser(stream)
+            self.cache.put(
+                (name, parser), value, parsed_size(value, self.getinfo(name).file_size)
+            )
+        return value
+
+    def read_steps(self, name, parser):
+        """
+        Like `read` for a streaming parser: parser(stream) is a generator yielding
+        the bytes it has processed (see port.progress) and returning the parsed
+        value. Use as `value = yield from archive.read_steps(name, parser)`
+        """
+        if name in self._shared:
+            value = self.cache.get((name, parser), _MISSING)
+            if value is not _MISSING:
+                return value
+
+        with self.open(name) as stream:
+            value = yield from parser(stream)
+        if name in self._shared:
+            self.cache.put(
+                (name, parser), value, parsed_size(value, self.getinfo(name).file_size)
+            )
+        return value
+
+    def close(self):
+        if self._directory is not None:
+            self._directory.close()
+            print(
+                f"{self.filename}: {self.counter.reads} reads, "
+                f"{self.counter.bytes_read} bytes read, "
+                f"{self.cache.hits} cached parses reused"
+            )
+        self._directory = None
+        self._index = None
+        self._shared = set()
+        self.cache.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
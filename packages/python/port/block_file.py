@@ -0,0 +1,159 @@
+import io
+from collections import OrderedDict
+
+############################
+# Block-buffered reading of the uploaded file
+############################
+
+# The upload is mounted through WORKERFS (see copyFileToPyFS in py_worker.js), where
+# every read on the file becomes a synchronous FileReaderSync slice of the browser
+# File. zipfile issues many small reads and seeks (headers, central directory,
+# decompression chunks), so reads are coalesced into large aligned blocks and the
+# most recently used blocks are kept in memory.
+
+
+class BlockFile(io.RawIOBase):
+    """Read-only, seekable file that reads its underlying file in aligned blocks
+
+    Attributes:
+        raw: underlying binary file, only ever read in whole blocks
+        block_size: size of a block in bytes
+        cache_blocks: number of blocks kept in the LRU cache
+    """
+
+    def __init__(self, raw, block_size=1 << 18, cache_blocks=16):
+        super().__init__()
+        self.raw = raw
+        self.block_size = block_size
+        self.cache_blocks = cache_blocks
+        self._blocks = OrderedDict()
+        self._pos = 0
+        self._size = raw.seek(0, io.SEEK_END)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self._size + offset
+        else:
+            raise ValueError(f"invalid whence ({whence})")
+        if pos < 0:
+            raise ValueError(f"negative seek position {pos}")
+        self._pos = pos
+        return pos
+
+    def _read_raw(self, start, view):
+        """Fill view with the bytes at start of the underlying file, return the count"""
+        self.raw.seek(start)
+        filled = 0
+        while filled < len(view):
+            n = self.raw.readinto(view[filled:])
+            if not n:
+                break
+            filled += n
+        return filled
+
+    def _block(self, index):
+        block = self._blocks.get(index)
+        if block is not None:
+            self._blocks.move_to_end(index)
+            return block
+
+        buffer = bytearray(min(self.block_size, self._size - index * self.block_size))
+        filled = self._read_raw(index * self.block_size, memoryview(buffer))
+        block = bytes(buffer[:filled])
+
+        self._blocks[index] = block
+        if len(self._blocks) > self.cache_blocks:
+            self._blocks.popitem(last=False)
+        return block
+
+    def readinto(self, buffer):
+        view = memoryview(buffer).cast("B")
+        total = 0
+        while total < len(view) and self._pos < self._size:
+            index, offset = divmod(self._pos, self.block_size)
+            wanted = len(view) - total
+
+            if offset == 0 and wanted >= self.block_size and index not in self._blocks:
+                # Large reads (whole members) skip the cache, in whole blocks
+                length = min(wanted - wanted % self.block_size, self._size - self._pos)
+                n = self._read_raw(self._pos, view[total : total + length])
+                if not n:
+                    break
+            else:
+                chunk = self._block(index)[offset : offset + wanted]
+                if not chunk:
+                    break
+                n = len(chunk)
+                view[total : total + n] = chunk
+
+            total += n
+            self._pos += n
+        return total
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = max(self._size - self._pos, 0)
+        buffer = bytearray(size)
+        n = self.readinto(buffer)
+        del buffer[n:]
+        return bytes(buffer)
+
+    def close(self):
+        if not self.closed:
+            self._blocks.clear()
+            self.raw.close()
+        super().close()
+
+
+class CountingFile(io.RawIOBase):
+    """Pass-through binary file counting what reaches the file it wraps
+
+    Attributes:
+        reads: number of read calls
+        bytes_read: number of bytes returned by those calls
+        seeks: number of seek calls
+    """
+
+    def __init__(self, raw):
+        super().__init__()
+        self.raw = raw
+        self.reads = 0
+        self.bytes_read = 0
+        self.seeks = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.raw.tell()
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self.seeks += 1
+        return self.raw.seek(offset, whence)
+
+    def readinto(self, buffer):
+        n = self.raw.readinto(buffer)
+        self.reads += 1
+        self.bytes_read += n or 0
+        return n
+
+    def close(self):
+        if not self.closed:
+            self.raw.close()
+        super().close()
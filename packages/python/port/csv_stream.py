@@ -0,0 +1,429 @@
+import contextlib
+import csv
+import io
+import itertools
+import warnings
+
+import pandas as pd
+
+############################
+# Streaming CSV reading from zip members
+############################
+
+# LinkedIn exports can contain CSV files of hundreds of MB (messages.csv), and some
+# exports are malformed: rows with missing or extra fields, quoted fields spanning
+# lines and quotes that are never closed. CsvReader hands pd.read_csv (C engine) a text
+# stream over the member itself, optionally in chunks, and parses only the columns
+# the extractor reads. Rows with too many fields are skipped by pandas and counted
+# from its on_bad_lines="warn" reports.
+#
+# Input pandas rejects as a whole, a quote that is never closed ("EOF inside string")
+# or a first row with an extra field (which pandas would read as an index column), is
+# parsed again by TolerantCsvReader, a single pass of csv.reader that keeps every row
+# it can place in the header's columns and counts the lines it has to drop. Rows
+# pandas already delivered as chunks are parsed but not returned a second time.
+#
+# A quote that is never closed makes csv.reader read on through the following lines
+# as one field, until the next quote or the end of the file. TolerantCsvReader
+# therefore checks records spanning several lines (and the last one) again with a
+# strict csv.reader; if their quotes are not closed properly, only their first line
+# is dropped and the lines after it are parsed again. Records of more than
+# MAX_RECORD_LINES lines are dropped whole.
+
+DELIMITERS = (",", ";", "\t")  # tried on the header row, the one giving most fields
+MAX_RECORD_LINES = 1000  # lines a single quoted field may span
+
+# The strings pd.read_csv reads as missing values
+NA_VALUES = frozenset(
+    (
+        "",
+        "#N/A",
+        "#N/A N/A",
+        "#NA",
+        "-1.#IND",
+        "-1.#QNAN",
+        "-NaN",
+        "-nan",
+        "1.#IND",
+        "1.#QNAN",
+        "<NA>",
+        "N/A",
+        "NA",
+        "NULL",
+        "NaN",
+        "None",
+        "n/a",
+        "nan",
+        "null",
+    )
+)
+
+
+def skip_notes(csv_file):
+    """
+    Position a binary CSV member stream at its header row
+
+    LinkedIn prefixes some files with a "Notes:" preamble. It is skipped line by
+    line until the header (the line containing "First Name" or "Email").
+    """
+    peek = csv_file.read(50).decode("utf-8", errors="ignore")
+    csv_file.seek(0)
+
+    if "Notes:" in peek:
+        while True:
+            position = csv_file.tell()
+            line = csv_file.readline()
+            if not line:
+                break  # no header, the stream is left at its end
+            decoded = line.decode("utf-8", errors="ignore")
+            if "First Name" in decoded or "Email" in decoded:
+                csv_file.seek(position)
+                break
+
+
+def open_csv_text(csv_file):
+    """
+    Wrap a binary CSV member stream in a text stream positioned at the header row,
+    skipping the notes preamble. Undecodable bytes are ignored.
+    """
+    skip_notes(csv_file)
+    return io.TextIOWrapper(csv_file, encoding="utf-8", errors="ignore", newline="")
+
+
+def column_matcher(columns):
+    """Predicate for column names containing one of the parts in columns, any case"""
+    parts = [part.upper() for part in columns]
+
+    def selected(name):
+        return any(part in name.upper() for part in parts)
+
+    return selected
+
+
+def header_delimiter(line):
+    """The delimiter of DELIMITERS that splits a header line into most fields"""
+    return max(
+        DELIMITERS,
+        key=lambda delimiter: len(next(csv.reader([line], delimiter=delimiter), [])),
+    )
+
+
+def column_selector(header, columns):
+    """
+    Build the usecols argument for pd.read_csv from a list of column name parts
+
+    A column is parsed if its name contains one of the parts, ignoring case. If no
+    column of the header matches, None is returned so that all columns are read and
+    the extractor's own fallbacks still apply.
+    """
+    selected = column_matcher(columns)
+    if not any(selected(name) for name in header):
+        return None
+    return selected
+
+
+class CsvReader:
+    """Parser of a CSV member stream: pd.read_csv, TolerantCsvReader where it fails
+
+    Every value is read as a string, pandas' default missing values as missing.
+    Rows with fewer fields than the header are padded with missing values, rows
+    with more fields are skipped and counted. If only some columns are parsed,
+    pandas keeps rows with extra fields and takes the columns by position.
+
+    Attributes:
+        columns: names of the parsed columns, [] if the member has no header row
+        rows: number of data rows read so far
+        skipped: number of lines skipped so far
+    """
+
+    __slots__ = (
+        "columns",
+        "rows",
+        "skipped",
+        "_csv_file",
+        "_delimiter",
+        "_columns",
+        "_usecols",
+    )
+
+    def __init__(self, csv_file, columns=None):
+        """
+        Parameters:
+        - csv_file: binary file object of the zip member
+        - columns: if given, only parse the columns whose name contains one of these
+          parts, see column_selector
+        """
+        self.columns = []
+        self.rows = 0
+        self.skipped = 0
+        self._csv_file = csv_file
+        self._columns = columns
+
+        skip_notes(csv_file)
+        position = csv_file.tell()
+        line = csv_file.readline().decode("utf-8", errors="ignore").lstrip("\ufeff")
+        csv_file.seek(position)
+        self._delimiter = header_delimiter(line)
+        header = next(csv.reader([line], delimiter=self._delimiter), [])
+        self._usecols = column_selector(header, columns) if columns else None
+
+    @contextlib.contextmanager
+    def _counting(self):
+        """Count the lines pandas reports skipping while the block runs"""
+        # pandas 1.x writes the reports to stderr, later versions warn
+        reports = io.StringIO()
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always", pd.errors.ParserWarning)
+            with contextlib.redirect_stderr(reports):
+                try:
+                    yield
+                finally:
+                    self.skipped += reports.getvalue().count("Skipping line")
+        for warning in caught:
+            if "Skipping line" in str(warning.message):
+                self.skipped += 1
+            else:
+                warnings.warn_explicit(
+                    warning.message, warning.category, warning.filename, warning.lineno
+                )
+
+    def _read_csv(self, text, chunksize=None):
+        return pd.read_csv(
+            text,
+            sep=self._delimiter,
+            dtype=str,  # Read everything as strings
+            usecols=self._usecols,
+            on_bad_lines="warn",  # Skip rows with too many fields, see _counting
+            chunksize=chunksize,
+        )
+
+    def _tolerant(self):
+        """TolerantCsvReader over the member from its start"""
+        self._csv_file.seek(0)
+        tolerant = TolerantCsvReader(self._csv_file, self._columns)
+        self.columns = tolerant.columns
+        return tolerant
+
+    def read(self):
+        """All rows as one DataFrame"""
+        text = io.TextIOWrapper(
+            self._csv_file, encoding="utf-8", errors="ignore", newline=""
+        )
+        try:
+            with self._counting():
+                df = self._read_csv(text)
+            # An index column inferred from a first row with an extra field
+            rejected = not isinstance(df.index, pd.RangeIndex)
+        except pd.errors.EmptyDataError:
+            return pd.DataFrame()
+        except pd.errors.ParserError:
+            rejected = True
+        finally:
+            text.detach()  # the member stays open
+
+        if rejected:
+            tolerant = self._tolerant()
+            df = tolerant.read()
+            self.skipped = tolerant.skipped
+        self.columns = list(df.columns)
+        self.rows = len(df)
+        return df
+
+    def chunks(self, chunksize):
+        """
+        Yield DataFrames of chunksize rows, numbered on from the previous chunk.
+        A member with a header but no rows yields one empty DataFrame, a member
+        without a header none
+        """
+        text = io.TextIOWrapper(
+            self._csv_file, encoding="utf-8", errors="ignore", newline=""
+        )
+        try:
+            with self._counting():
+                frames = self._read_csv(text, chunksize)
+            while True:
+                with self._counting():
+                    chunk = next(frames, None)
+                if chunk is None:
+                    return
+                if not isinstance(chunk.index, pd.RangeIndex):
+                    break  # an inferred index column, see read
+                self.columns = list(chunk.columns)
+                self.rows += len(chunk)
+                yield chunk
+        except pd.errors.EmptyDataError:
+            return
+        except pd.errors.ParserError:
+            pass
+        finally:
+            text.detach()
+
+        # The rows pandas delivered are parsed again, but not yielded again
+        tolerant = self._tolerant()
+        tolerant.skip(self.rows)
+        for chunk in tolerant.chunks(chunksize):
+            self.rows, self.skipped = tolerant.rows, tolerant.skipped
+            yield chunk
+        self.rows, self.skipped = tolerant.rows, tolerant.skipped
+
+
+class TolerantCsvReader:
+    """Single-pass, tolerant parser of a CSV member stream
+
+    Every value is read as a string, the strings in NA_VALUES as missing values.
+    Rows with fewer fields than the header are padded with missing values. Rows
+    with more fields, rows csv.reader rejects and the first line of a record with
+    an unclosed quote are skipped and counted.
+
+    Attributes:
+        columns: names of the parsed columns, [] if the member has no header row
+        rows: number of data rows read so far
+        skipped: number of lines skipped so far
+    """
+
+    __slots__ = (
+        "columns",
+        "rows",
+        "skipped",
+        "_text",
+        "_delimiter",
+        "_width",
+        "_keep",
+        "_reader",
+        "_record",
+        "_pending",
+        "_eof",
+    )
+
+    def __init__(self, csv_file, columns=None):
+        """
+        Parameters:
+        - csv_file: binary file object of the zip member
+        - columns: if given, only parse the columns whose name contains one of these
+          parts. If none does, all columns are parsed so that the extractor's own
+          fallbacks still apply
+        """
+        self.columns = []
+        self.rows = 0
+        self.skipped = 0
+        self._text = iter(open_csv_text(csv_file))
+        self._record = []  # lines of the record being parsed
+        self._pending = []  # lines to parse again, in reverse order
+        self._eof = False
+
+        first_line = next(self._text, "").lstrip("\ufeff")
+        self._delimiter = header_delimiter(first_line)
+        self._pending.append(first_line)
+        self._reader = csv.reader(self._lines(), delimiter=self._delimiter)
+
+        header = next(self._reader, None) or []
+        self._width = len(header)
+        self._keep = None  # all columns
+        if columns and header:
+            selected = column_matcher(columns)
+            if any(selected(name) for name in header):
+                self._keep = [i for i, name in enumerate(header) if selected(name)]
+        if self._keep is None:
+            self.columns = header
+        else:
+            self.columns = [header[i] for i in self._keep]
+
+    def _lines(self):
+        """Lines for csv.reader: the lines to parse again, then the stream's"""
+        pending, record = self._pending, self._record
+        while True:
+            if pending:
+                line = pending.pop()
+            else:
+                line = next(self._text, None)
+                if line is None:
+                    self._eof = True
+                    return
+            record.append(line)
+            yield line
+
+    def _resync(self):
+        """Skip the first line of the current record and parse its others again"""
+        self.skipped += 1
+        self._pending.extend(reversed(self._record[1:]))
+        # The line generator may have ended with the stream, start a new one
+        self._reader = csv.reader(self._lines(), delimiter=self._delimiter)
+
+    def _unclosed(self, row):
+        """
+        Whether the record of row has a quote that is not closed properly: a strict
+        csv.reader rejects it (a closing quote followed by text, or the end of the
+        file inside quotes) or splits it into several rows
+        """
+        try:
+            strict = csv.reader(self._record, delimiter=self._delimiter, strict=True)
+            return sum(1 for _ in strict) != 1
+        except csv.Error:
+            return True
+
+    def __iter__(self):
+        """Yield the parsed data rows, as lists of the values of the parsed columns"""
+        width, keep, record = self._width, self._keep, self._record
+        if not width:
+            return
+        while True:
+            record.clear()
+            try:
+                row = next(self._reader)
+            except StopIteration:
+                return
+            except csv.Error:
+                self._resync()
+                continue
+
+            if len(record) > MAX_RECORD_LINES:
+                # Too long for a field, whether its quote was closed or not
+                self.skipped += len(record)
+            elif (
+                len(record) > 1 or (self._eof and not self._pending)
+            ) and self._unclosed(row):
+                self._resync()
+            elif len(row) == width:
+                self.rows += 1
+                yield row if keep is None else [row[i] for i in keep]
+            elif len(row) > width:
+                self.skipped += len(record)
+            elif row:
+                self.rows += 1
+                row += [""] * (width - len(row))
+                yield row if keep is None else [row[i] for i in keep]
+
+    def _frame(self, rows, start):
+        df = pd.DataFrame(
+            rows,
+            columns=self.columns,
+            index=pd.RangeIndex(start, start + len(rows)),
+            dtype=object,
+        )
+        return df.where(~df.isin(NA_VALUES))
+
+    def skip(self, rows):
+        """Parse the next rows rows without returning them"""
+        for _ in itertools.islice(self, rows):
+            pass
+
+    def read(self):
+        """All (remaining) rows as one DataFrame"""
+        start = self.rows
+        return self._frame(list(self), start)
+
+    def chunks(self, chunksize):
+        """
+        Yield DataFrames of chunksize rows, numbered on from the previous chunk.
+        A member with a header but no rows yields one empty DataFrame
+        """
+        rows = iter(self)
+        start = self.rows
+        while True:
+            chunk = list(itertools.islice(rows, chunksize))
+            if not chunk and start > 0:
+                return
+            yield self._frame(chunk, start)
+            if len(chunk) < chunksize:
+                return
+            start += len(chunk)
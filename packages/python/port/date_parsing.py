@@ -0,0 +1,102 @@
+import pandas as pd
+
+############################
+# Date parsing with inferred formats
+############################
+
+# pd.to_datetime without a format parses LinkedIn dates such as "8/22/24, 10:54 PM"
+# element by element with dateutil, which dominates the extraction time of large
+# exports. parse_dates instead tries the known export formats on a small sample of
+# the column, parses the whole column with the one that matches and only hands the
+# rows that do not match to the generic parser. Inferred formats are cached per
+# (file, column), so chunked files are only inferred once. Only formats that matched
+# are cached: a chunk without any parseable value is inferred again with the next.
+
+# Formats found in the exports, ambiguous ones month first like dateutil
+DATE_FORMATS = (
+    "%Y-%m-%d %H:%M:%S UTC",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+    "%Y/%m/%d %H:%M:%S UTC",
+    "%Y/%m/%d %H:%M:%S",
+    "%Y/%m/%d",
+    "%m/%d/%y, %I:%M %p",
+    "%m/%d/%Y, %I:%M %p",
+    "%m/%d/%y %H:%M",
+    "%m/%d/%Y %H:%M",
+    "%m/%d/%y",
+    "%m/%d/%Y",
+    "%a %b %d %H:%M:%S UTC %Y",
+    "%d %b %Y",
+    "%b %d, %Y",
+    "%d.%m.%Y %H:%M:%S",
+    "%d.%m.%Y",
+)
+
+SAMPLE_SIZE = 50  # non-empty values the format is inferred from
+
+_formats = {}  # (file, column) -> inferred format
+
+
+def reset_date_formats():
+    """Forget the inferred formats, e.g. when another file is uploaded"""
+    _formats.clear()
+
+
+def infer_date_format(values):
+    """
+    The format of DATE_FORMATS that parses most of a sample of values, or None if
+    none parses any
+    """
+    sample = values.dropna()
+    sample = sample[sample.astype(str).str.strip() != ""].iloc[:SAMPLE_SIZE]
+
+    best_format, best_count = None, 0
+    for date_format in DATE_FORMATS:
+        count = pd.to_datetime(sample, format=date_format, errors="coerce").count()
+        if count > best_count:
+            best_format, best_count = date_format, count
+            if count == len(sample):
+                break
+    return best_format
+
+
+def _parse_any(values):
+    """Generic (per element) parsing to naive datetimes, NaT where not a date"""
+    parsed = pd.to_datetime(values, errors="coerce")
+    if isinstance(parsed.dtype, pd.DatetimeTZDtype):
+        return parsed.dt.tz_localize(None)
+    if parsed.dtype == object:
+        # Mixed UTC offsets: count each value at its UTC time
+        return pd.to_datetime(values, errors="coerce", utc=True).dt.tz_localize(None)
+    return parsed
+
+
+def parse_dates(values, key=None):
+    """
+    Parse a Series of date strings to naive datetimes, NaT where a value is not
+    a date. Times keep the wall-clock time written in the file
+
+    Parameters:
+    - values: Series of strings
+    - key: (file, column) under which the inferred format is cached, None to
+      infer it for this call only
+    """
+    date_format = _formats.get(key) if key is not None else None
+    if date_format is None:
+        date_format = infer_date_format(values)
+        if key is not None and date_format is not None:
+            _formats[key] = date_format
+
+    if date_format is None:
+        return _parse_any(values)
+
+    parsed = pd.to_datetime(values, format=date_format, errors="coerce")
+    if parsed.dtype != "datetime64[ns]":
+        # ISO formats also accept UTC offsets, which _parse_any resolves
+        return _parse_any(values)
+    failed = parsed.isna() & values.notna()
+    if failed.any():
+        parsed[failed] = _parse_any(values[failed])
+    return parsed
@@ -0,0 +1,108 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+############################
+# Counting per day on integer day numbers
+############################
+
+# Most extractors count events per day. Rather than building a date string for every
+# event and grouping on those strings, events are mapped to integer day numbers (days
+# since 1970-01-01), counted with np.unique/np.bincount, and only the distinct days
+# are formatted for the output rows.
+#
+# Extractors keep dates as day numbers (int32 columns) so that tables sort and group
+# chronologically. A day column is marked in DataFrame.attrs with its display format
+# and only turned into strings by format_day_columns when the consent table is built.
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+NANOSECONDS_PER_DAY = 86400 * 10**9
+DAY_COLUMNS = "day_columns"  # DataFrame.attrs key, column name -> date format
+
+
+def day_number(day: date) -> int:
+    """Days since 1970-01-01 of a date"""
+    return day.toordinal() - EPOCH_ORDINAL
+
+
+def datetimes_to_days(datetimes):
+    """
+    Day numbers of the dates in a datetime Series, missing values (NaT) are dropped
+
+    Time zone aware values are counted on their local date, like .dt.strftime does.
+    """
+    values = datetimes.dropna()
+    if getattr(values.dt, "tz", None) is not None:
+        values = values.dt.tz_localize(None)
+    return values.to_numpy(dtype="datetime64[ns]").astype(np.int64) // (
+        NANOSECONDS_PER_DAY
+    )
+
+
+def day_histogram(days, weights=None):
+    """
+    Count day numbers, or sum their weights
+
+    Returns:
+    - (distinct days in increasing order, count or weight sum per day). Sums of
+      integer weights stay integers
+    """
+    unique_days, index = np.unique(
+        np.asarray(days, dtype=np.int64), return_inverse=True
+    )
+    if weights is None:
+        totals = np.bincount(index, minlength=len(unique_days))
+    else:
+        weights = np.asarray(weights)
+        totals = np.bincount(index, weights=weights, minlength=len(unique_days))
+        if np.issubdtype(weights.dtype, np.integer):
+            totals = totals.astype(np.int64)
+    return unique_days, totals
+
+
+def format_days(days, date_format) -> list[str]:
+    """Format day numbers as date strings, e.g. "%Y-%m-%d" """
+    return [
+        date.fromordinal(EPOCH_ORDINAL + int(day)).strftime(date_format) for day in days
+    ]
+
+
+def day_column(df, column, date_format):
+    """
+    Mark a column of df as holding day numbers, shown with date_format (e.g.
+    "%Y-%m-%d") once formatted by format_day_columns. Returns df
+    """
+    df.attrs.setdefault(DAY_COLUMNS, {})[column] = date_format
+    return df
+
+
+def format_day_columns(df):
+    """Copy of df with its marked day columns formatted as date strings"""
+    day_columns = df.attrs.get(DAY_COLUMNS)
+    if not day_columns:
+        return df
+
+    df = df.copy()
+    df.attrs = {}
+    for column, date_format in day_columns.items():
+        unique_days, inverse = np.unique(df[column].to_numpy(), return_inverse=True)
+        labels = np.array(format_days(unique_days, date_format), dtype=object)
+        df[column] = labels[inverse]
+    return df
+
+
+def count_per_day(days, date_format, date_column, value_column, weights=None):
+    """
+    Table with the number of events (or the sum of weights) per day, in
+    chronological order. The date column holds day numbers, see day_column
+
+    Parameters:
+    - days: day numbers of the events
+    - date_format: strftime format of the date column
+    - date_column, value_column: names of the two output columns
+    - weights: optional weight per event
+    """
+    unique_days, totals = day_histogram(days, weights)
+    df = pd.DataFrame({date_column: unique_days.astype(np.int32), value_column: totals})
+    return day_column(df, date_column, date_format)
@@ -1,36 +1,161 @@
 from port.api.assets import *
 from port.api.props import Translatable
+from port.day_histogram import (
+    EPOCH_ORDINAL,
+    count_per_day,
+    day_column,
+    day_number,
+)
+from port.user_agents import add_device_columns
+import numpy as np
 import pandas as pd
-from datetime import datetime, timezone, timedelta
+from datetime import date, datetime, timezone, timedelta
 import re
+import time
 
 ############################
 # Helper functions for extraction
 ############################
 
 
-# convert timespamp
-def epoch_to_date(epoch_timestamp: str | int) -> str:
+DATE_FORMAT = "%d-%m-%Y"
+FAKE_DAY = day_number(date(1999, 1, 1))  # day of timestamps that cannot be converted
+UTC_OFFSET = 3600  # UTC +1, in seconds
+SECONDS_PER_DAY = 86400
+# Timestamps whose UTC +1 date lies within the years 1 to 9999
+MIN_EPOCH = -62135596800 - UTC_OFFSET
+MAX_EPOCH = 253402300799 - UTC_OFFSET
+
+
+def epochs_to_days(epochs, unit="s"):
+    """
+    Convert epoch timestamps to day numbers (days since 1970-01-01, see
+    port.day_histogram) in one vectorized pass. Assumes UTC +1
+
+    Parameters:
+    - epochs: sequence or array of timestamps (numbers or numeric strings)
+    - unit: "s" for seconds or "ms" for milliseconds
+
+    Values that cannot be converted get the day of the fake date "01-01-1999".
+    """
+    values = np.asarray(pd.to_numeric(epochs, errors="coerce"), dtype="float64")
+    if unit == "ms":
+        seconds = np.floor(values / 1000)
+    else:
+        seconds = np.trunc(values)
+
+    valid = np.isfinite(seconds) & (seconds >= MIN_EPOCH) & (seconds <= MAX_EPOCH)
+    days = np.full(len(values), FAKE_DAY, dtype=np.int64)
+    days[valid] = (seconds[valid].astype(np.int64) + UTC_OFFSET) // SECONDS_PER_DAY
+    return days
+
+
+def count_epochs_per_day(epochs, date_column, value_column, unit="s"):
+    """Table with the number of timestamps per (UTC +1) day, see count_per_day"""
+    return count_per_day(
+        epochs_to_days(epochs, unit), DATE_FORMAT, date_column, value_column
+    )
+
+
+# sessionization of viewing activity
+SESSION_BREAK_THRESHOLD = 60  # seconds without activity that end a session
+DEFAULT_ACTIVITY_TIME = 30  # seconds added for the last activity in a session
+
+# extract_time_spent and extract_session_frequency both summarize the sessions of
+# the viewing activity. The content step sessionizes the impression frames once and
+# hands the same per-day summary to both (see extract_instagram_content_from_zip_folder)
+
+
+def merge_timestamps(combined_data):
+    """
+    Sorted int64 array of all impression timestamps in combined_data
+
+    combined_data maps "posts_viewed" and "videos_watched" to impression frames
+    (see read_impression_history) or None
     """
-    Convert epoch timestamp to an ISO 8601 string. Assumes UTC +1
+    frames = [
+        combined_data[key]["timestamp"].to_numpy(dtype=np.int64)
+        for key in ("posts_viewed", "videos_watched")
+        if combined_data.get(key) is not None
+    ]
+    if not frames:
+        return np.array([], dtype=np.int64)
+    return np.sort(np.concatenate(frames), kind="stable")
+
+
+def local_day_numbers(timestamps):
+    """Days since 1970-01-01 in the local time zone, like datetime.fromtimestamp"""
+    hours = timestamps // 3600
+    unique_hours, hour_index = np.unique(hours, return_inverse=True)
+    # UTC offsets only change at whole hours, look them up once per hour
+    offsets = np.array(
+        [time.localtime(int(hour) * 3600).tm_gmtoff for hour in unique_hours],
+        dtype=np.int64,
+    )
+    return (timestamps + offsets[hour_index]) // SECONDS_PER_DAY
+
 
-    If timestamp cannot be converted raise CannotConvertEpochTimestamp
+def sessionize(
+    timestamps,
+    session_break_threshold=SESSION_BREAK_THRESHOLD,
+    default_activity_time=DEFAULT_ACTIVITY_TIME,
+):
     """
+    Split sorted activity timestamps into sessions and summarize them per day
 
-    try:
-        epoch_timestamp = int(epoch_timestamp)
-        out = datetime.fromtimestamp(
-            epoch_timestamp, tz=timezone(timedelta(hours=1))
-        ).isoformat()  # timezone = utc + 1
+    A session continues while the time between two activities is at most
+    session_break_threshold seconds. Sessions reset at (local) midnight. The
+    duration of a session is the time from its first to its last activity plus
+    default_activity_time.
 
-    except:
-        # fake date if unable to convert
-        out = "01-01-1999"
+    Parameters:
+    - timestamps: sorted int64 array of epoch seconds (see merge_timestamps)
 
-    out = pd.to_datetime(out)
-    return out.date().strftime(
-        "%d-%m-%Y"
-    )  # convertion to string for display in browser
+    Returns:
+    - DataFrame with one row per day with activity, in chronological order: "day"
+      (day number of the UTC +1 date, see epochs_to_days), "sessions" (number of
+      sessions) and "seconds" (total session duration)
+    """
+    if len(timestamps) == 0:
+        return pd.DataFrame(
+            {
+                "day": pd.Series(dtype=np.int32),
+                "sessions": pd.Series(dtype=np.int64),
+                "seconds": pd.Series(dtype=np.int64),
+            }
+        )
+
+    days = local_day_numbers(timestamps)
+
+    # A session starts at the first activity, on a new day or after a long gap
+    breaks = np.empty(len(timestamps), dtype=bool)
+    breaks[0] = True
+    breaks[1:] = (days[1:] != days[:-1]) | (
+        np.diff(timestamps) > session_break_threshold
+    )
+
+    starts = np.flatnonzero(breaks)
+    ends = np.append(starts[1:] - 1, len(timestamps) - 1)
+    durations = timestamps[ends] - timestamps[starts] + default_activity_time
+
+    session_days = days[starts]
+    unique_days, day_index = np.unique(session_days, return_inverse=True)
+    sessions = np.bincount(day_index)
+    seconds = np.bincount(day_index, weights=durations).astype(np.int64)
+
+    # Label each day by its local midnight
+    midnights = [
+        int(datetime.fromordinal(int(day) + EPOCH_ORDINAL).timestamp())
+        for day in unique_days
+    ]
+
+    return pd.DataFrame(
+        {
+            "day": epochs_to_days(midnights).astype(np.int32),
+            "sessions": sessions,
+            "seconds": seconds,
+        }
+    )
 
 
 # translate outputs
@@ -82,13 +207,14 @@ def translate(value, locale, dummy_decider=None):
 ############################
 
 
-def extract_time_spent(combined_data, locale):
+def extract_time_spent(daily_sessions, locale):
     """
     Calculate the total time spent on Instagram per day.
-    A session continues if the time between views is less than 60 seconds.
+    A session continues if the time between views is at most 60 seconds.
     Sessions reset at midnight.
 
-    Works with either posts_viewed, videos_watched, or both.
+    daily_sessions is the per-day summary of the sessions in posts_viewed,
+    videos_watched or both, see sessionize.
     """
 
     tl_date = translate("date", locale)
@@ -101,113 +227,25 @@ def extract_time_spent(combined_data, locale):
         locale,
     )
 
-    # Constants
-    SESSION_BREAK_THRESHOLD = 60  # seconds
-    DEFAULT_ACTIVITY_TIME = 30  # seconds for the last activity in a session
-
-    # Extract data from the combined format
-    posts_viewed_json = combined_data.get("posts_viewed", {})
-    videos_watched_json = combined_data.get("videos_watched", {})
-
-    # Get timestamps from post views (if available)
-    post_timestamps = []
-    if posts_viewed_json:
-        post_timestamps = [
-            entry["string_map_data"]["Time"]["timestamp"]
-            for entry in posts_viewed_json.get("impressions_history_posts_seen", [])
-            if "Time" in entry["string_map_data"]
-        ]
-
-    # Get timestamps from video views (if available)
-    video_timestamps = []
-    if videos_watched_json:
-        video_timestamps = [
-            entry["string_map_data"]["Time"]["timestamp"]
-            for entry in videos_watched_json.get(
-                "impressions_history_videos_watched", []
-            )
-            if "Time" in entry["string_map_data"]
-        ]
-
-    # Combine and sort all timestamps
-    all_timestamps = sorted(post_timestamps + video_timestamps)
-
-    if not all_timestamps:
+    if daily_sessions.empty:
         return pd.DataFrame(columns=[tl_date, tl_value])
 
-    # Calculate time spent per day
-    from datetime import datetime
-
-    daily_time_spent = {}
-    session_start_time = None
-    last_time = None
-    current_day = None
-
-    for ts in all_timestamps:
-        current_time = datetime.fromtimestamp(ts)
-        new_day = current_time.date()
-
-        # Initialize the day in our dictionary if needed
-        if new_day not in daily_time_spent:
-            daily_time_spent[new_day] = 0
-
-        # Check if we're starting a new session
-        start_new_session = False
-
-        if last_time is None:
-            # First activity
-            start_new_session = True
-        elif new_day != current_day:
-            # Day changed, end previous session and start new one
-            if session_start_time:
-                session_time = (
-                    last_time - session_start_time
-                ).total_seconds() + DEFAULT_ACTIVITY_TIME
-                daily_time_spent[current_day] += session_time
-            start_new_session = True
-        elif (current_time - last_time).total_seconds() > SESSION_BREAK_THRESHOLD:
-            # More than threshold time since last activity, end session and start new
-            if session_start_time:
-                session_time = (
-                    last_time - session_start_time
-                ).total_seconds() + DEFAULT_ACTIVITY_TIME
-                daily_time_spent[current_day] += session_time
-            start_new_session = True
-
-        if start_new_session:
-            session_start_time = current_time
-
-        # Update for the next iteration
-        last_time = current_time
-        current_day = new_day
-
-    # Handle the last session
-    if session_start_time and last_time:
-        session_time = (
-            last_time - session_start_time
-        ).total_seconds() + DEFAULT_ACTIVITY_TIME
-        daily_time_spent[current_day] += session_time
-
-    # Convert to DataFrame
-    dates = [
-        epoch_to_date(int(datetime(d.year, d.month, d.day).timestamp()))
-        for d in daily_time_spent.keys()
-    ]
-    times = [round(t) for t in daily_time_spent.values()]  # Round to whole seconds
-
-    result_df = pd.DataFrame({tl_date: dates, tl_value: times})
+    result_df = pd.DataFrame(
+        {tl_date: daily_sessions["day"], tl_value: daily_sessions["seconds"]}
+    )
     result_df = result_df.sort_values(by=tl_date).reset_index(drop=True)
 
-    return result_df
+    return day_column(result_df, tl_date, DATE_FORMAT)
 
 
-def extract_session_frequency(combined_data, locale):
+def extract_session_frequency(daily_sessions, locale):
     """
     Calculate how many Instagram sessions a user had per day.
-    A session is defined as a sequence of activities with less than 60 seconds between them.
+    A session is defined as a sequence of activities at most 60 seconds apart.
     Sessions reset at midnight.
 
-    Works with either posts_viewed, videos_watched, or both.
+    daily_sessions is the per-day summary of the sessions in posts_viewed,
+    videos_watched or both, see sessionize.
     """
 
     tl_date = translate("date", locale)
@@ -220,89 +258,22 @@ def extract_session_frequency(combined_data, locale):
         locale,
     )
 
-    # Constants
-    SESSION_BREAK_THRESHOLD = 60  # seconds
-
-    # Extract data from the combined format
-    posts_viewed_json = combined_data.get("posts_viewed", {})
-    videos_watched_json = combined_data.get("videos_watched", {})
-
-    # Get timestamps from post views (if available)
-    post_timestamps = []
-    if posts_viewed_json:
-        post_timestamps = [
-            entry["string_map_data"]["Time"]["timestamp"]
-            for entry in posts_viewed_json.get("impressions_history_posts_seen", [])
-            if "Time" in entry["string_map_data"]
-        ]
-
-    # Get timestamps from video views (if available)
-    video_timestamps = []
-    if videos_watched_json:
-        video_timestamps = [
-            entry["string_map_data"]["Time"]["timestamp"]
-            for entry in videos_watched_json.get(
-                "impressions_history_videos_watched", []
-            )
-            if "Time" in entry["string_map_data"]
-        ]
-
-    # Combine and sort all timestamps
-    all_timestamps = sorted(post_timestamps + video_timestamps)
-
-    if not all_timestamps:
+    if daily_sessions.empty:
         return pd.DataFrame(columns=[tl_date, tl_value])
 
-    # Count sessions per day
-    from datetime import datetime
-
-    daily_sessions = {}
-    last_time = None
-    current_day = None
-
-    for ts in all_timestamps:
-        current_time = datetime.fromtimestamp(ts)
-        new_day = current_time.date()
-
-        # Initialize the day in our dictionary if needed
-        if new_day not in daily_sessions:
-            daily_sessions[new_day] = 0
-
-        # Check if we're starting a new session
-        start_new_session = False
-
-        if last_time is None:
-            # First activity
-            start_new_session = True
-        elif new_day != current_day:
-            # Day changed, start new session
-            start_new_session = True
-        elif (current_time - last_time).total_seconds() > SESSION_BREAK_THRESHOLD:
-            # More than threshold time since last activity
-            start_new_session = True
-
-        if start_new_session:
-            daily_sessions[new_day] += 1
-
-        # Update for the next iteration
-        last_time = current_time
-        current_day = new_day
-
-    # Convert to DataFrame
-    dates = [
-        epoch_to_date(int(datetime(d.year, d.month, d.day).timestamp()))
-        for d in daily_sessions.keys()
-    ]
-    sessions = list(daily_sessions.values())
-
-    result_df = pd.DataFrame({tl_date: dates, tl_value: sessions})
+    result_df = pd.DataFrame(
+        {tl_date: daily_sessions["day"], tl_value: daily_sessions["sessions"]}
+    )
     result_df = result_df.sort_values(by=tl_date).reset_index(drop=True)
 
-    return result_df
+    return day_column(result_df, tl_date, DATE_FORMAT)
+
 
+def extract_ads_seen(ads_seen_df, locale):
+    """extract ads_information/ads_and_topics/ads_viewed -> list of authors per day
 
-def extract_ads_seen(ads_seen_json, locale):
-    """extract ads_information/ads_and_topics/ads_viewed -> list of authors per day"""
+    ads_seen_df is the impression frame with timestamp and author columns
+    """
 
     tl_date = translate("date", locale)
     tl_value = translate(
@@ -310,15 +281,9 @@ def extract_ads_seen(ads_seen_json, locale):
         locale,
     )
 
-    timestamps = [
-        t["string_map_data"]["Time"]["timestamp"]
-        for t in ads_seen_json["impressions_history_ads_seen"]
-    ]  # get list with timestamps in epoch format (if author exists)
-    dates = [epoch_to_date(t) for t in timestamps]  # convert epochs to dates
-    authors = [
-        i["string_map_data"]["Author"]["value"]
-        if "Author" in i["string_map_data"]
-        else translate(
+    days = epochs_to_days(ads_seen_df["timestamp"].to_numpy())  # epochs to days
+    authors = ads_seen_df["author"].fillna(
+        translate(
             {
                 "en": "Unknown account",
                 "de": "Unbekanntes Konto",
@@ -326,14 +291,15 @@ def extract_ads_seen(ads_seen_json, locale):
             },
             locale,
         )
-        for i in ads_seen_json["impressions_history_ads_seen"]
-    ]  # not for all viewed ads there is an author!
+    )  # not for all viewed ads there is an author!
 
-    adds_viewed_df = pd.DataFrame({tl_date: dates, tl_value: authors})
+    adds_viewed_df = pd.DataFrame(
+        {tl_date: days.astype(np.int32), tl_value: authors.tolist()}
+    )
 
     aggregated_df = adds_viewed_df.groupby(tl_date)[tl_value].agg(list).reset_index()
 
-    return aggregated_df
+    return day_column(aggregated_df, tl_date, DATE_FORMAT)
 
 
 def extract_ads_clicked(ads_clicked_json, locale):
@@ -349,14 +315,14 @@ def extract_ads_clicked(ads_clicked_json, locale):
         t["string_list_data"][0]["timestamp"]
         for t in ads_clicked_json["impressions_history_ads_clicked"]
     ]  # get list with timestamps in epoch format
-    dates = [epoch_to_date(t) for t in timestamps]  # convert epochs to dates
+    days = epochs_to_days(timestamps)  # convert epochs to days
     products = [i["title"] for i in ads_clicked_json["impressions_history_ads_clicked"]]
 
-    adds_clicked_df = pd.DataFrame({tl_date: dates, tl_value: products})
+    adds_clicked_df = pd.DataFrame({tl_date: days.astype(np.int32), tl_value: products})
 
     aggregated_df = adds_clicked_df.groupby(tl_date)[tl_value].agg(list).reset_index()
 
-    return aggregated_df
+    return day_column(aggregated_df, tl_date, DATE_FORMAT)
 
 
 def extract_recently_viewed_items(recently_viewed_items_json, locale):
@@ -379,8 +345,11 @@ def extract_recently_viewed_items(recently_viewed_items_json, locale):
     return products_df
 
 
-def extract_posts_seen(posts_seen_json, locale):
-    """extract ads_information/ads_and_topics/posts_viewed -> count per day"""
+def extract_posts_seen(posts_seen_df, locale):
+    """extract ads_information/ads_and_topics/posts_viewed -> count per day
+
+    posts_seen_df is the impression frame with a timestamp column
+    """
 
     tl_date = translate("date", locale)
     tl_value = translate(
@@ -392,22 +361,15 @@ def extract_posts_seen(posts_seen_json, locale):
         locale,
     )
 
-    timestamps = [
-        t["string_map_data"]["Time"]["timestamp"]
-        for t in posts_seen_json["impressions_history_posts_seen"]
-    ]  # get list with timestamps in epoch format
-    dates = [epoch_to_date(t) for t in timestamps]  # convert epochs to dates
-    postViewedDates_df = pd.DataFrame(dates, columns=[tl_date])  # convert to df
-
-    aggregated_df = postViewedDates_df.groupby([tl_date])[
-        tl_date
-    ].size()  # count number of rows per day
+    timestamps = posts_seen_df["timestamp"].to_numpy()  # timestamps in epoch format
+    return count_epochs_per_day(timestamps, tl_date, tl_value)
 
-    return aggregated_df.reset_index(name=tl_value)
 
+def extract_videos_seen(videos_seen_df, locale):
+    """extract ads_information/ads_and_topics/videos_watched -> count per day
 
-def extract_videos_seen(videos_seen_json, locale):
-    """extract ads_information/ads_and_topics/videos_watched -> count per day"""
+    videos_seen_df is the impression frame with a timestamp column
+    """
 
     tl_date = translate("date", locale)
     tl_value = translate(
@@ -419,18 +381,8 @@ def extract_videos_seen(videos_seen_json, locale):
         locale,
     )
 
-    timestamps = [
-        t["string_map_data"]["Time"]["timestamp"]
-        for t in videos_seen_json["impressions_history_videos_watched"]
-    ]  # get list with timestamps in epoch format
-    dates = [epoch_to_date(t) for t in timestamps]  # convert epochs to dates
-    videosViewedDates_df = pd.DataFrame(dates, columns=[tl_date])  # convert to df
-
-    aggregated_df = videosViewedDates_df.groupby([tl_date])[
-        tl_date
-    ].size()  # count number of rows per day
-
-    return aggregated_df.reset_index(name=tl_value)
+    timestamps = videos_seen_df["timestamp"].to_numpy()  # timestamps in epoch format
+    return count_epochs_per_day(timestamps, tl_date, tl_value)
 
 
 def extract_paid_subscription(paid_subscription_json, locale):
@@ -468,17 +420,12 @@ def extract_blocked_profiles(blocked_profiles_json, locale):
         locale,
     )
 
-    dates = [
-        epoch_to_date(t["string_list_data"][0]["timestamp"])
+    epochs = [
+        t["string_list_data"][0]["timestamp"]
         for t in blocked_profiles_json["relationships_blocked_users"]
     ]  # get list with timestamps in epoch format
-    dates_df = pd.DataFrame(dates, columns=[tl_date])  # convert to df
 
-    aggregated_df = dates_df.groupby([tl_date])[
-        tl_date
-    ].size()  # count number of rows per day
-
-    return aggregated_df.reset_index(name=tl_value)
+    return count_epochs_per_day(epochs, tl_date, tl_value)
 
 
 def extract_restricted_profiles(restricted_profiles_json, locale):
@@ -494,17 +441,12 @@ def extract_restricted_profiles(restricted_profiles_json, locale):
         locale,
     )
 
-    dates = [
-        epoch_to_date(t["string_list_data"][0]["timestamp"])
+    epochs = [
+        t["string_list_data"][0]["timestamp"]
         for t in restricted_profiles_json["relationships_restricted_users"]
     ]  # get list with timestamps in epoch format
-    dates_df = pd.DataFrame(dates, columns=[tl_date])  # convert to df
 
-    aggregated_df = dates_df.groupby([tl_date])[
-        tl_date
-    ].size()  # count number of rows per day
-
-    return aggregated_df.reset_index(name=tl_value)
+    return count_epochs_per_day(epochs, tl_date, tl_value)
 
 
 def extract_post_comments(post_comments_json, locale):
@@ -522,22 +464,12 @@ def extract_post_comments(post_comments_json, locale):
 
     # file can just be dict and not list if only one posted comment
     if isinstance(post_comments_json, dict):
-        dates = [
-            epoch_to_date(post_comments_json["string_map_data"]["Time"]["timestamp"])
-        ]
+        timestamps = [post_comments_json["string_map_data"]["Time"]["timestamp"]]
     else:
-        dates = [
-            epoch_to_date(t["string_map_data"]["Time"]["timestamp"])
-            for t in post_comments_json
+        timestamps = [
+            t["string_map_data"]["Time"]["timestamp"] for t in post_comments_json
         ]  # get list with timestamps in epoch format
-
-    dates_df = pd.DataFrame(dates, columns=[tl_date])  # convert to df
-
-    aggregated_df = dates_df.groupby([tl_date])[
-        tl_date
-    ].size()  # count number of rows per day
-
-    return aggregated_df.reset_index(name=tl_value)
+    return count_epochs_per_day(timestamps, tl_date, tl_value)
 
 
 def extract_reel_comments(reel_comments_json, locale):
@@ -553,17 +485,12 @@ def extract_reel_comments(reel_comments_json, locale):
         locale,
     )
 
-    dates = [
-        epoch_to_date(t["string_map_data"]["Time"]["timestamp"])
+    epochs = [
+        t["string_map_data"]["Time"]["timestamp"]
         for t in reel_comments_json["comments_reels_comments"]
     ]  # get list with timestamps in epoch format
-    dates_df = pd.DataFrame(dates, columns=[tl_date])  # convert to df
 
-    aggregated_df = dates_df.groupby([tl_date])[
-        tl_date
-    ].size()  # count number of rows per day
-
-    return aggregated_df.reset_index(name=tl_value)
+    return count_epochs_per_day(epochs, tl_date, tl_value)
 
 
 def extract_posts_liked(posts_liked_json, locale):
@@ -579,17 +506,12 @@ def extract_posts_liked(posts_liked_json, locale):
         locale,
     )
 
-    dates = [
-        epoch_to_date(t["string_list_data"][0]["timestamp"])
+    epochs = [
+        t["string_list_data"][0]["timestamp"]
         for t in posts_liked_json["likes_media_likes"]
     ]
-    dates_df = pd.DataFrame(dates, columns=[tl_date])  # convert to df
 
-    aggregated_df = dates_df.groupby([tl_date])[
-        tl_date
-    ].size()  # count number of rows per day
-
-    return aggregated_df.reset_index(name=tl_value)
+    return count_epochs_per_day(epochs, tl_date, tl_value)
 
 
 def extract_stories_liked(stories_liked_json, locale):
@@ -605,17 +527,12 @@ def extract_stories_liked(stories_liked_json, locale):
         locale,
     )
 
-    dates = [
-        epoch_to_date(t["string_list_data"][0]["timestamp"])
+    epochs = [
+        t["string_list_data"][0]["timestamp"]
         for t in stories_liked_json["story_activities_story_likes"]
     ]  # get list with timestamps in epoch format
-    dates_df = pd.DataFrame(dates, columns=[tl_date])  # convert to df
 
-    aggregated_df = dates_df.groupby([tl_date])[
-        tl_date
-    ].size()  # count number of rows per day
-
-    return aggregated_df.reset_index(name=tl_value)
+    return count_epochs_per_day(epochs, tl_date, tl_value)
 
 
 def extract_comments_liked(comments_liked_json, locale):
@@ -631,17 +548,12 @@ def extract_comments_liked(comments_liked_json, locale):
         locale,
     )
 
-    dates = [
-        epoch_to_date(t["string_list_data"][0]["timestamp"])
+    epochs = [
+        t["string_list_data"][0]["timestamp"]
         for t in comments_liked_json["likes_comment_likes"]
     ]
-    dates_df = pd.DataFrame(dates, columns=[tl_date])  # convert to df
-
-    aggregated_df = dates_df.groupby([tl_date])[
-        tl_date
-    ].size()  # count number of rows per day
 
-    return aggregated_df.reset_index(name=tl_value)
+    return count_epochs_per_day(epochs, tl_date, tl_value)
 
 
 def extract_story_interaction_countdowns(story_interaction_countdowns_json, locale):
@@ -657,17 +569,12 @@ def extract_story_interaction_countdowns(story_interaction_countdowns_json, loca
         locale,
     )
 
-    dates = [
-        epoch_to_date(t["string_list_data"][0]["timestamp"])
+    epochs = [
+        t["string_list_data"][0]["timestamp"]
         for t in story_interaction_countdowns_json["story_activities_countdowns"]
     ]  # get list with timestamps in epoch format
-    dates_df = pd.DataFrame(dates, columns=[tl_date])  # convert to df
-
-    aggregated_df = dates_df.groupby([tl_date])[
-        tl_date
-    ].size()  # count number of rows per day
 
-    return aggregated_df.reset_index(name=tl_value)
+    return count_epochs_per_day(epochs, tl_date, tl_value)
 
 
 def extract_story_interaction_emoji_sliders(
@@ -685,17 +592,12 @@ def extract_story_interaction_emoji_sliders(
         locale,
     )
 
-    dates = [
-        epoch_to_date(t["string_list_data"][0]["timestamp"])
+    epochs = [
+        t["string_list_data"][0]["timestamp"]
         for t in story_interaction_emoji_sliders_json["story_activities_emoji_sliders"]
     ]  # get list with timestamps in epoch format
-    dates_df = pd.DataFrame(dates, columns=[tl_date])  # convert to df
-
-    aggregated_df = dates_df.groupby([tl_date])[
-        tl_date
-    ].size()  # count number of rows per day
 
-    return aggregated_df.reset_index(name=tl_value)
+    return count_epochs_per_day(epochs, tl_date, tl_value)
 
 
 def extract_story_interaction_polls(story_interaction_polls_json, locale):
@@ -711,17 +613,12 @@ def extract_story_interaction_polls(story_interaction_polls_json, locale):
         locale,
     )
 
-    dates = [
-        epoch_to_date(t["string_list_data"][0]["timestamp"])
+    epochs = [
+        t["string_list_data"][0]["timestamp"]
         for t in story_interaction_polls_json["story_activities_polls"]
     ]  # get list with timestamps in epoch format
-    dates_df = pd.DataFrame(dates, columns=[tl_date])  # convert to df
-
-    aggregated_df = dates_df.groupby([tl_date])[
-        tl_date
-    ].size()  # count number of rows per day
 
-    return aggregated_df.reset_index(name=tl_value)
+    return count_epochs_per_day(epochs, tl_date, tl_value)
 
 
 def extract_story_interaction_questions(story_interaction_questions_json, locale):
@@ -737,17 +634,12 @@ def extract_story_interaction_questions(story_interaction_questions_json, locale
         locale,
     )
 
-    dates = [
-        epoch_to_date(t["string_list_data"][0]["timestamp"])
+    epochs = [
+        t["string_list_data"][0]["timestamp"]
         for t in story_interaction_questions_json["story_activities_questions"]
     ]  # get list with timestamps in epoch format
-    dates_df = pd.DataFrame(dates, columns=[tl_date])  # convert to df
 
-    aggregated_df = dates_df.groupby([tl_date])[
-        tl_date
-    ].size()  # count number of rows per day
-
-    return aggregated_df.reset_index(name=tl_value)
+    return count_epochs_per_day(epochs, tl_date, tl_value)
 
 
 def extract_story_interaction_quizzes(story_interaction_quizzes_json, locale):
@@ -763,17 +655,12 @@ def extract_story_interaction_quizzes(story_interaction_quizzes_json, locale):
         locale,
     )
 
-    dates = [
-        epoch_to_date(t["string_list_data"][0]["timestamp"])
+    epochs = [
+        t["string_list_data"][0]["timestamp"]
         for t in story_interaction_quizzes_json["story_activities_quizzes"]
     ]  # get list with timestamps in epoch format
-    dates_df = pd.DataFrame(dates, columns=[tl_date])  # convert to df
 
-    aggregated_df = dates_df.groupby([tl_date])[
-        tl_date
-    ].size()  # count number of rows per day
-
-    return aggregated_df.reset_index(name=tl_value)
+    return count_epochs_per_day(epochs, tl_date, tl_value)
 
 
 def extract_posts_created(posts_created_json, locale):
@@ -788,12 +675,13 @@ def extract_posts_created(posts_created_json, locale):
         locale,
     )
 
+    timestamps = []
     results = []
 
     # file can just be dict and not list if only one post
     if isinstance(posts_created_json, dict):
         for media in posts_created_json.get("media", []):
-            date = epoch_to_date(media.get("creation_timestamp", ""))
+            timestamps.append(media.get("creation_timestamp", ""))
             has_latitude_data = any(
                 "latitude" in exif_data
                 for exif_data in media.get("media_metadata", {})
@@ -801,17 +689,12 @@ def extract_posts_created(posts_created_json, locale):
                 .get("exif_data", [])
             )
 
-            results.append(
-                {
-                    tl_value[0]: date,
-                    tl_value[1]: translate("dummy", locale, has_latitude_data),
-                }
-            )
+            results.append({tl_value[1]: translate("dummy", locale, has_latitude_data)})
 
     else:
         for post in posts_created_json:
             for media in post.get("media", []):
-                date = epoch_to_date(media.get("creation_timestamp", ""))
+                timestamps.append(media.get("creation_timestamp", ""))
                 has_latitude_data = any(
                     "latitude" in exif_data
                     for exif_data in media.get("media_metadata", {})
@@ -820,13 +703,13 @@ def extract_posts_created(posts_created_json, locale):
                 )
 
                 results.append(
-                    {
-                        tl_value[0]: date,
-                        tl_value[1]: translate("dummy", locale, has_latitude_data),
-                    }
+                    {tl_value[1]: translate("dummy", locale, has_latitude_data)}
                 )
 
     posts_df = pd.DataFrame(results)
+    if results:
+        posts_df.insert(0, tl_value[0], epochs_to_days(timestamps).astype(np.int32))
+        day_column(posts_df, tl_value[0], DATE_FORMAT)
 
     return posts_df
 
@@ -843,10 +726,11 @@ def extract_stories_created(stories_created_json, locale):
         locale,
     )
 
+    timestamps = []
     results = []
 
     for story in stories_created_json.get("ig_stories", []):
-        date = epoch_to_date(story.get("creation_timestamp", ""))
+        timestamps.append(story.get("creation_timestamp", ""))
         has_latitude_data = any(
             "latitude" in exif_data
             for exif_data in story.get("media_metadata", {})
@@ -854,14 +738,12 @@ def extract_stories_created(stories_created_json, locale):
             .get("exif_data", [])
         )
 
-        results.append(
-            {
-                tl_value[0]: date,
-                tl_value[1]: translate("dummy", locale, has_latitude_data),
-            }
-        )
+        results.append({tl_value[1]: translate("dummy", locale, has_latitude_data)})
 
     stories_df = pd.DataFrame(results)
+    if results:
+        stories_df.insert(0, tl_value[0], epochs_to_days(timestamps).astype(np.int32))
+        day_column(stories_df, tl_value[0], DATE_FORMAT)
 
     return stories_df
 
@@ -874,18 +756,13 @@ def extract_reels_created(reels_created_json, locale):
         {"en": "Count of reels", "de": "Anzahl der Reels", "nl": "Aantal reels"}, locale
     )
 
-    dates = [
-        epoch_to_date(media.get("creation_timestamp"))
+    epochs = [
+        media.get("creation_timestamp")
         for reel in reels_created_json.get("ig_reels_media", [])
         for media in reel.get("media", [])
     ]
-    dates_df = pd.DataFrame(dates, columns=[tl_date])  # convert to df
 
-    aggregated_df = dates_df.groupby([tl_date])[
-        tl_date
-    ].size()  # count number of rows per day
-
-    return aggregated_df.reset_index(name=tl_value)
+    return count_epochs_per_day(epochs, tl_date, tl_value)
 
 
 def extract_followers_new(followers_new_json, locale):
@@ -903,20 +780,10 @@ def extract_followers_new(followers_new_json, locale):
 
     # file can just be dict and not list if only one follower
     if isinstance(followers_new_json, dict):
-        dates = [epoch_to_date(followers_new_json["string_list_data"][0]["timestamp"])]
+        timestamps = [followers_new_json["string_list_data"][0]["timestamp"]]
     else:
-        dates = [
-            epoch_to_date(t["string_list_data"][0]["timestamp"])
-            for t in followers_new_json
-        ]
-
-    dates_df = pd.DataFrame(dates, columns=[tl_date])  # convert to df
-
-    aggregated_df = dates_df.groupby([tl_date])[
-        tl_date
-    ].size()  # count number of rows per day
-
-    return aggregated_df.reset_index(name=tl_value)
+        timestamps = [t["string_list_data"][0]["timestamp"] for t in followers_new_json]
+    return count_epochs_per_day(timestamps, tl_date, tl_value)
 
 
 def extract_search_history(search_history_json, locale):
@@ -946,30 +813,21 @@ def extract_search_history(search_history_json, locale):
         if timestamp_key and "timestamp" in search["string_map_data"][timestamp_key]:
             timestamps.append(search["string_map_data"][timestamp_key]["timestamp"])
 
-    # Convert timestamps to dates
-    dates = [epoch_to_date(t) for t in timestamps]
-
-    # Create DataFrame
-    if dates:
-        search_df = pd.DataFrame(dates, columns=[tl_date])
-
-        # Count searches per day
-        aggregated_df = (
-            search_df.groupby([tl_date])[tl_date].size().reset_index(name=tl_value)
-        )
-
-        return aggregated_df
+    # Count searches per day
+    if timestamps:
+        return count_epochs_per_day(timestamps, tl_date, tl_value)
 
     # Return empty DataFrame if no searches found
     return pd.DataFrame(columns=[tl_date, tl_value])
 
 
-def extract_messages(combined_messages_data, locale):
+def extract_messages(daily_counts, locale):
     """
     Extract message counts per day from all Instagram conversations.
 
-    This function processes the combined messages data structure that contains
-    messages from all conversations in the Instagram data export.
+    daily_counts maps day numbers (see epochs_to_days) to the number of messages
+    the participant sent that day, counted over all conversations while the
+    message files were streamed (see read_outgoing_messages in port.script).
     """
 
     tl_date = translate("date", locale)
@@ -982,30 +840,13 @@ def extract_messages(combined_messages_data, locale):
         locale,
     )
 
-    # Process all messages
-    message_counts = {}
-
-    # Check if we have the combined messages data structure
-    if combined_messages_data and "combined_messages" in combined_messages_data:
-        for message in combined_messages_data["combined_messages"]:
-            # Convert timestamp (milliseconds) to date
-            date = epoch_to_date(
-                message["timestamp_ms"] // 1000
-            )  # Divide by 1000 to convert ms to seconds
-
-            # Increment count for this date
-            if date in message_counts:
-                message_counts[date] += 1
-            else:
-                message_counts[date] = 1
-
-    # Convert to DataFrame
-    if message_counts:
-        dates = list(message_counts.keys())
-        counts = list(message_counts.values())
-        result_df = pd.DataFrame({tl_date: dates, tl_value: counts})
-        result_df = result_df.sort_values(by=tl_date).reset_index(drop=True)
-        return result_df
+    # Count messages per day
+    if daily_counts:
+        days = np.fromiter(daily_counts.keys(), dtype=np.int64, count=len(daily_counts))
+        counts = np.fromiter(
+            daily_counts.values(), dtype=np.int64, count=len(daily_counts)
+        )
+        return count_per_day(days, DATE_FORMAT, tl_date, tl_value, weights=counts)
 
     # Return empty DataFrame if no messages found
     return pd.DataFrame(columns=[tl_date, tl_value])
@@ -1125,7 +966,7 @@ def extract_topic_interests(topic_interests_json, locale):
 
 
 def extract_login_activity(login_activity_json, locale):
-    """extract security_and_login_information/login_and_account_creation/login_activity -> time and user agent"""
+    """extract security_and_login_information/login_and_account_creation/login_activity -> time and device of every login"""
 
     tl_date = translate("date", locale)
     tl_value1 = translate({"en": "Time", "de": "Uhrzeit", "nl": "Tijd"}, locale)
@@ -1142,12 +983,13 @@ def extract_login_activity(login_activity_json, locale):
     user_agents = [t["string_map_data"]["User Agent"]["value"] for t in logins]
 
     login_df = pd.DataFrame({tl_date: dates, tl_value1: times, tl_value2: user_agents})
+    login_df = add_device_columns(login_df, tl_value2, locale)
 
     return login_df
 
 
 def extract_logout_activity(logout_activity_json, locale):
-    """extract security_and_login_information/login_and_account_creation/logout_activity -> time and user agent"""
+    """extract security_and_login_information/login_and_account_creation/logout_activity -> time and device of every logout"""
 
     tl_date = translate("date", locale)
     tl_value1 = translate({"en": "Time", "de": "Uhrzeit", "nl": "Tijd"}, locale)
@@ -1164,5 +1006,6 @@ def extract_logout_activity(logout_activity_json, locale):
     user_agents = [t["string_map_data"]["User Agent"]["value"] for t in logouts]
 
     logout_df = pd.DataFrame({tl_date: dates, tl_value1: times, tl_value2: user_agents})
+    logout_df = add_device_columns(logout_df, tl_value2, locale)
 
     return logout_df
@@ -0,0 +1,137 @@
+import codecs
+import json
+
+############################
+# Incremental JSON parsing from file streams
+############################
+
+# Large exports (e.g. Instagram impression histories) are hundreds of MB. Instead of
+# json.loads on the whole file, the functions below walk the document from a binary
+# stream (such as the one returned by ZipFile.open) and decode one array element at
+# a time, so only the current element and a small text buffer are held in memory.
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789+-.eE"
+
+
+class _TextBuffer:
+    """Decoded text window over a binary stream"""
+
+    __slots__ = "stream", "chunk_size", "decoder", "text", "pos", "eof"
+
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Read the next chunk, at least doubling the pending text for large values"""
+        if self.eof:
+            return False
+        pending = self.text[self.pos :]
+        chunk = self.stream.read(max(self.chunk_size, len(pending)))
+        if not chunk:
+            self.eof = True
+        self.text = pending + self.decoder.decode(chunk, final=self.eof)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character, or "" at the end of the stream"""
+        while True:
+            text, pos = self.text, self.pos
+            while pos < len(text) and text[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(text):
+                return text[pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self.text, self.pos)
+        self.pos += 1
+
+    def value(self):
+        """Decode the complete JSON value at the current position"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                # Value continues in the next chunk
+                if not self.fill():
+                    raise
+                continue
+            if not self.eof:
+                # A number could be cut off at the end of the buffer
+                tail = end
+                while tail < len(self.text) and self.text[tail] in _NUMBER_CHARS:
+                    tail += 1
+                if tail == len(self.text):
+                    self.fill()
+                    continue
+            self.pos = end
+            return value
+
+
+def _iter_elements(buffer):
+    """Yield the elements of the array that starts at the current position"""
+    buffer.expect("[")
+    if buffer.peek() == "]":
+        buffer.pos += 1
+        return
+    while True:
+        yield buffer.value()
+        if buffer.peek() == ",":
+            buffer.pos += 1
+        else:
+            buffer.expect("]")
+            return
+
+
+def iter_array(stream, key=None, chunk_size=1 << 16, header=None):
+    """
+    Iterate over the elements of a JSON array without loading the whole document
+
+    Parameters:
+    - stream: binary file object with the JSON document
+    - key: None if the document itself is an array. Otherwise the document is an
+      object and the array stored under this top-level key is iterated; all other
+      top-level values are decoded and discarded
+    - chunk_size: number of bytes read from the stream at a time
+    - header: optional dict that receives the top-level values preceding the
+      array, before its first element is yielded (e.g. the participants of an
+      Instagram conversation)
+
+    Yields nothing if the document is an object without the key or if its value
+    is not an array.
+    """
+    buffer = _TextBuffer(stream, chunk_size)
+
+    if key is None:
+        yield from _iter_elements(buffer)
+        return
+
+    buffer.expect("{")
+    if buffer.peek() == "}":
+        return
+    while True:
+        name = buffer.value()
+        buffer.expect(":")
+        if name == key and buffer.peek() == "[":
+            yield from _iter_elements(buffer)
+            return
+        value = buffer.value()
+        if header is not None:
+            header[name] = value
+        if buffer.peek() == ",":
+            buffer.pos += 1
+        else:
+            buffer.expect("}")
+            return
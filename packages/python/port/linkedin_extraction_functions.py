@@ -1,5 +1,9 @@
 from port.api.assets import *
 from port.api.props import Translatable
+from port.day_histogram import count_per_day, datetimes_to_days
+from port.date_parsing import parse_dates
+from port.user_agents import add_device_columns
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import re
@@ -113,40 +117,26 @@ def extract_connections(connections_csv, locale):
             }
         )
 
-    # Process each connection date
-    results = []
-    grouped_connections = connections_csv.groupby(date_column)
-    for date, group in grouped_connections:
-        # Convert date to standard format
-        try:
-            date_obj = pd.to_datetime(date, format="%d %b %Y")
-            std_date = date_obj.strftime("%Y-%m-%d")
-        except:
-            std_date = str(date)
-
-        # Count connections for this date
-        count = len(group)
-
-        # Calculate absolute counts for each field
-        has_names = sum((group["First Name"].notna()) & (group["Last Name"].notna()))
-        has_url = sum(group["URL"].notna())
-        has_email = sum(group["Email Address"].notna())
-        has_company = sum(group["Company"].notna())
-        has_position = sum(group["Position"].notna())
-
-        results.append(
-            {
-                tl_date: std_date,
-                tl_count: count,
-                tl_has_names: has_names,
-                tl_has_url: has_url,
-                tl_has_email: has_email,
-                tl_has_company: has_company,
-                tl_has_position: has_position,
-            }
-        )
+    # Normalize the dates once, dates that cannot be parsed are kept as they are
+    dates = parse_dates(connections_csv[date_column], ("connections", date_column))
+    std_dates = dates.dt.strftime("%Y-%m-%d").fillna(connections_csv[date_column])
 
-    if not results:
+    # Count connections and filled in fields per date in one grouped aggregation
+    fields = pd.DataFrame(
+        {
+            tl_count: 1,
+            tl_has_names: connections_csv["First Name"].notna()
+            & connections_csv["Last Name"].notna(),
+            tl_has_url: connections_csv["URL"].notna(),
+            tl_has_email: connections_csv["Email Address"].notna(),
+            tl_has_company: connections_csv["Company"].notna(),
+            tl_has_position: connections_csv["Position"].notna(),
+        },
+        index=connections_csv.index,
+    )
+    results = fields.groupby(std_dates.rename(tl_date)).sum().reset_index()
+
+    if results.empty:
         return pd.DataFrame(
             {
                 tl_date: ["N/A"],
@@ -159,7 +149,7 @@ def extract_connections(connections_csv, locale):
             }
         )
 
-    return pd.DataFrame(results)
+    return results
 
 
 def extract_comments(comments_csv, locale):
@@ -194,22 +184,13 @@ def extract_comments(comments_csv, locale):
             }
         )
 
-    # Process comments data
-    # Create a copy to avoid SettingWithCopyWarning
-    processed_df = comments_csv.copy()
-
-    # Convert dates to a standard format
-    processed_df["formatted_date"] = pd.to_datetime(
-        processed_df[date_column], errors="coerce"
-    ).dt.strftime("%Y-%m-%d")
-
-    # Count comments per day
-    daily_counts = (
-        processed_df.groupby("formatted_date").size().reset_index(name=tl_count)
+    # Day of each comment, entries that are not dates are dropped
+    days = datetimes_to_days(
+        parse_dates(comments_csv[date_column], ("comments", date_column))
     )
-    daily_counts.rename(columns={"formatted_date": tl_date}, inplace=True)
 
-    return daily_counts
+    # Count comments per day
+    return count_per_day(days, "%Y-%m-%d", tl_date, tl_count)
 
 
 def extract_reactions(reactions_csv, locale):
@@ -255,8 +236,8 @@ def extract_reactions(reactions_csv, locale):
     # Process reaction data
     # Convert dates to a standard format
     processed_df = reactions_csv.copy()
-    processed_df["formatted_date"] = pd.to_datetime(
-        processed_df[date_column]
+    processed_df["formatted_date"] = parse_dates(
+        processed_df[date_column], ("reactions", date_column)
     ).dt.strftime("%Y-%m-%d")
 
     # Group by date and reaction type
@@ -304,26 +285,89 @@ def extract_shares(shares_csv, locale):
             }
         )
 
-    # Process shares data
-    # Create a copy to avoid SettingWithCopyWarning
-    processed_df = shares_csv.copy()
-
-    # Convert dates to a standard format
-    processed_df["formatted_date"] = pd.to_datetime(
-        processed_df[date_column], errors="coerce"
-    ).dt.strftime("%Y-%m-%d")
+    # Day of each share, entries that are not dates are dropped
+    days = datetimes_to_days(
+        parse_dates(shares_csv[date_column], ("shares", date_column))
+    )
 
     # Count shares per day
-    daily_counts = (
-        processed_df.groupby("formatted_date").size().reset_index(name=tl_count)
-    )
-    daily_counts.rename(columns={"formatted_date": tl_date}, inplace=True)
+    return count_per_day(days, "%Y-%m-%d", tl_date, tl_count)
+
+
+class MessageCounts:
+    """Messages per day and their distinct senders, counted chunk by chunk
+
+    The date and sender columns are looked up in the first chunk. Chunked files
+    are counted while they are read (see extract_linkedin_content_from_zip_folder),
+    so only one chunk is in memory at a time.
+
+    Attributes:
+        date_col: name of the date column, None if not found
+        sender_col: name of the sender column, None if not found
+        total_messages: number of rows counted
+        daily_messages: "%Y-%m-%d" day -> number of messages
+        daily_members: "%Y-%m-%d" day -> set of senders
+    """
+
+    __slots__ = (
+        "date_col",
+        "sender_col",
+        "total_messages",
+        "daily_messages",
+        "daily_members",
+        "_chunks",
+    )
+
+    def __init__(self):
+        self.date_col = None
+        self.sender_col = None
+        self.total_messages = 0
+        self.daily_messages = {}
+        self.daily_members = {}
+        self._chunks = 0
+
+    def add(self, chunk):
+        """Count the messages of a DataFrame chunk"""
+        if self._chunks == 0:
+            # Try to find date column
+            for col in chunk.columns:
+                if "DATE" in col.upper() or "DATUM" in col.upper():
+                    self.date_col = col
+                    break
 
-    return daily_counts
+            # Try to find sender column
+            for col in chunk.columns:
+                if (
+                    "FROM" in col.upper()
+                    or "VON" in col.upper()
+                    or "SENDER" in col.upper()
+                ):
+                    self.sender_col = col
+                    break
+        self._chunks += 1
+
+        self.total_messages += len(chunk)
+        if not self.date_col or not self.sender_col:
+            return  # only count the messages
+
+        # Use date part only, NaT values are dropped
+        dates = parse_dates(
+            chunk[self.date_col], ("messages", self.date_col)
+        ).dt.strftime("%Y-%m-%d")
+        valid = dates.notna()
+
+        # Count messages and collect unique members per day
+        for day, senders in chunk.loc[valid, self.sender_col].groupby(dates[valid]):
+            self.daily_messages[day] = self.daily_messages.get(day, 0) + len(senders)
+            self.daily_members.setdefault(day, set()).update(senders)
 
 
 def extract_messages(messages_csv, locale):
-    """Extract LinkedIn messages data aggregated by day and member"""
+    """Extract LinkedIn messages data aggregated by day and member
+
+    messages_csv is a DataFrame, an iterator of DataFrame chunks or the
+    MessageCounts of a file counted while it was read
+    """
 
     tl_date = translate("date", locale)
     tl_count = translate(
@@ -343,38 +387,26 @@ def extract_messages(messages_csv, locale):
         locale,
     )
 
-    # Try to find date column
-    date_col = None
-    for col in messages_csv.columns:
-        if "DATE" in col.upper() or "DATUM" in col.upper():
-            date_col = col
-            break
-
-    # Try to find sender column
-    sender_col = None
-    for col in messages_csv.columns:
-        if "FROM" in col.upper() or "VON" in col.upper() or "SENDER" in col.upper():
-            sender_col = col
-            break
+    if isinstance(messages_csv, MessageCounts):
+        counts = messages_csv
+    else:
+        counts = MessageCounts()
+        chunks = (
+            [messages_csv] if isinstance(messages_csv, pd.DataFrame) else messages_csv
+        )
+        for chunk in chunks:
+            counts.add(chunk)
 
-    if not date_col or not sender_col:
+    if not counts.date_col or not counts.sender_col:
         return pd.DataFrame(
             {
                 tl_date: ["N/A"],
-                tl_count: [f"Total messages: {len(messages_csv)}"],
+                tl_count: [f"Total messages: {counts.total_messages}"],
                 tl_members: ["Column not found"],
             }
         )
 
-    # Process each day
-    messages_csv[date_col] = pd.to_datetime(messages_csv[date_col], errors="coerce")
-    # Use date part only
-    messages_csv["DATE_STD"] = messages_csv[date_col].dt.strftime("%Y-%m-%d")
-
-    # Remove NaT values
-    messages_csv = messages_csv.dropna(subset=["DATE_STD"])
-
-    if messages_csv.empty:
+    if not counts.daily_messages:
         return pd.DataFrame(
             {
                 tl_date: ["N/A"],
@@ -383,22 +415,13 @@ def extract_messages(messages_csv, locale):
             }
         )
 
-    # Group by date and count messages and unique members
-    daily_counts = (
-        messages_csv.groupby("DATE_STD")
-        .agg(
-            message_count=("DATE_STD", "count"),
-            members=(sender_col, lambda x: len(set(x))),
-        )
-        .reset_index()
-    )
-
     # Create result DataFrame
+    days = sorted(counts.daily_messages)
     result_df = pd.DataFrame(
         {
-            tl_date: daily_counts["DATE_STD"],
-            tl_count: daily_counts["message_count"],
-            tl_members: daily_counts["members"],
+            tl_date: days,
+            tl_count: [counts.daily_messages[day] for day in days],
+            tl_members: [len(counts.daily_members[day]) for day in days],
         }
     )
 
@@ -433,21 +456,29 @@ def extract_search_queries(search_queries_csv, locale):
             }
         )
 
-    # Create a copy to avoid SettingWithCopyWarning
-    processed_df = search_queries_csv.copy()
-
-    # Convert dates to a standard readable format
-    processed_df["formatted_date"] = pd.to_datetime(
-        processed_df[time_column], format="%Y/%m/%d %H:%M:%S UTC", errors="coerce"
-    ).dt.strftime("%Y-%m-%d")
+    # Day of each search, entries that are not dates are dropped
+    days = datetimes_to_days(
+        pd.to_datetime(
+            search_queries_csv[time_column],
+            format="%Y/%m/%d %H:%M:%S UTC",
+            errors="coerce",
+        )
+    )
 
     # Count searches per day
-    daily_counts = (
-        processed_df.groupby("formatted_date").size().reset_index(name=tl_count)
-    )
-    daily_counts.rename(columns={"formatted_date": tl_date}, inplace=True)
+    return count_per_day(days, "%Y-%m-%d", tl_date, tl_count)
+
+
+def split_items(values):
+    """
+    Items of cells holding several values separated by ";" or double spaces
 
-    return daily_counts
+    Returns a Series of the stripped, non-empty items of all cells, in order
+    """
+    values = values.dropna().astype(str).str.strip()
+    items = values[values != ""].str.split(";").explode().str.split("  ").explode()
+    items = items.str.strip()
+    return items[items.notna() & (items != "")]
 
 
 def extract_interests(ad_targeting_csv, locale):
@@ -475,37 +506,18 @@ def extract_interests(ad_targeting_csv, locale):
         return pd.DataFrame({tl_interest: ["No interests column found in data"]})
 
     # Process the interests
-    all_interests = []
-
-    # Get the first non-empty value from the column
-    for _, row in ad_targeting_csv.iterrows():
-        if pd.notna(row[interest_col]):
-            value = str(row[interest_col]).strip()
-            if value:
-                # Your data appears to have multiple items in the cell
-                # Try to split by different separators
-                items = []
-                for item in value.split(";"):
-                    items.extend(i.strip() for i in item.split("  ") if i.strip())
-                all_interests.extend(items)
+    all_interests = split_items(ad_targeting_csv[interest_col])
 
     # If no interests found, try "Member Skills" as fallback
-    if not all_interests and "Member Skills" in ad_targeting_csv.columns:
-        for _, row in ad_targeting_csv.iterrows():
-            if pd.notna(row["Member Skills"]):
-                value = str(row["Member Skills"]).strip()
-                if value:
-                    items = []
-                    for item in value.split(";"):
-                        items.extend(i.strip() for i in item.split("  ") if i.strip())
-                    all_interests.extend(items)
-
-    if not all_interests:
+    if all_interests.empty and "Member Skills" in ad_targeting_csv.columns:
+        all_interests = split_items(ad_targeting_csv["Member Skills"])
+
+    if all_interests.empty:
         return pd.DataFrame({tl_interest: ["No interests found in data"]})
 
     # Remove duplicates and create DataFrame
-    unique_interests = sorted(set(all_interests))
-    result_df = pd.DataFrame({tl_interest: unique_interests})
+    unique_interests = all_interests.drop_duplicates().sort_values()
+    result_df = pd.DataFrame({tl_interest: unique_interests.to_numpy()})
 
     return result_df
 
@@ -558,28 +570,23 @@ def extract_member_follows(member_follows_csv, locale):
             }
         )
 
-    # Process member follows data
-    # Create a copy to avoid SettingWithCopyWarning
-    processed_df = member_follows_csv.copy()
-
-    # Convert dates to a standard format
-    processed_df["formatted_date"] = pd.to_datetime(
-        processed_df[date_column], errors="coerce"
-    ).dt.strftime("%Y-%m-%d")
-
-    # Create status categories
-    processed_df["is_active"] = (
-        processed_df[status_column].str.lower().str.contains("active")
+    # Day of each row, entries that are not dates are dropped
+    dates = parse_dates(
+        member_follows_csv[date_column], ("member_follows", date_column)
     )
+    valid = dates.notna()
 
-    # Group by date and count follows/unfollows
-    result = []
-    for date, group in processed_df.groupby("formatted_date"):
-        follows = sum(group["is_active"])
-
-        result.append({tl_date: date, tl_follows: follows})
+    # Status categories, a follow counts when its status contains "active"
+    is_active = member_follows_csv[status_column].str.lower().str.contains("active")
 
-    return pd.DataFrame(result)
+    # Count follows per day
+    return count_per_day(
+        datetimes_to_days(dates),
+        "%Y-%m-%d",
+        tl_date,
+        tl_follows,
+        weights=is_active[valid].fillna(False).to_numpy(dtype=np.int64),
+    )
 
 
 def extract_profile(profile_csv, locale):
@@ -774,7 +781,6 @@ def extract_device_usage(device_csv, locale):
         },
         locale,
     )
-
     # Check if the file is a login file or security challenges file
     is_login_file = False
     for col in device_csv.columns:
@@ -819,32 +825,36 @@ def extract_device_usage(device_csv, locale):
         if not user_agent_column and len(device_csv.columns) >= 3:
             user_agent_column = device_csv.columns[2]
 
-    results = []
-    for _, row in device_csv.iterrows():
-        # Get the date
-        date_str = "Unknown Date"
-        if date_column:
-            date_str = str(row[date_column])
-            date_parts = date_str.split()
-            if len(date_parts) >= 3:
-                date_str = f"{date_parts[1]} {date_parts[2]}, {date_parts[-1]}"  # Format: "Apr 29, 2023"
-
-        # Get user agent
-        user_agent = "Unknown"
-        if user_agent_column and pd.notna(row[user_agent_column]):
-            user_agent = row[user_agent_column]
-        else:
-            # Try to find it in any column
-            for col, value in row.items():
-                if isinstance(value, str) and (
-                    "Mozilla" in value or "AppleWebKit" in value
-                ):
-                    user_agent = value
-                    break
+    # Dates are shortened to month, day and year: "Apr 29, 2023"
+    if date_column:
+        dates = device_csv[date_column].astype(str)
+        date_parts = dates.str.split()
+        dates = dates.where(
+            date_parts.str.len() < 3,
+            date_parts.str[1] + " " + date_parts.str[2] + ", " + date_parts.str[-1],
+        )
+    else:
+        dates = pd.Series("Unknown Date", index=device_csv.index)
 
-        results.append({tl_date: date_str, tl_user_agent: user_agent})
+    # User agents, if missing taken from the first cell that looks like one
+    if user_agent_column:
+        user_agents = device_csv[user_agent_column]
+    else:
+        user_agents = pd.Series(None, index=device_csv.index, dtype=object)
+    for col in device_csv.columns:
+        if not user_agents.isna().any():
+            break
+        values = device_csv[col]
+        if values.dtype != object:
+            continue
+        is_agent = values.str.contains("Mozilla|AppleWebKit", regex=True, na=False)
+        user_agents = user_agents.fillna(values.where(is_agent))
+    user_agents = user_agents.fillna("Unknown")
 
-    return pd.DataFrame(results)
+    device_df = pd.DataFrame(
+        {tl_date: dates.to_numpy(), tl_user_agent: user_agents.to_numpy()}
+    )
+    return add_device_columns(device_df, tl_user_agent, locale)
 
 
 def extract_saved_jobs(saved_jobs_csv, locale):
@@ -879,20 +889,11 @@ def extract_saved_jobs(saved_jobs_csv, locale):
             }
         )
 
-    # Process saved jobs data
-    # Create a copy to avoid SettingWithCopyWarning
-    processed_df = saved_jobs_csv.copy()
-
-    # Convert dates to a standard format
+    # Day of each saved job, entries that are not dates are dropped
     # Date format in example: 8/22/24, 10:54 PM
-    processed_df["formatted_date"] = pd.to_datetime(
-        processed_df[date_column], errors="coerce"
-    ).dt.strftime("%Y-%m-%d")
-
-    # Count saved jobs per day
-    daily_counts = (
-        processed_df.groupby("formatted_date").size().reset_index(name=tl_value)
+    days = datetimes_to_days(
+        parse_dates(saved_jobs_csv[date_column], ("saved_jobs", date_column))
     )
-    daily_counts.rename(columns={"formatted_date": tl_date}, inplace=True)
 
-    return daily_counts
+    # Count saved jobs per day
+    return count_per_day(days, "%Y-%m-%d", tl_date, tl_value)
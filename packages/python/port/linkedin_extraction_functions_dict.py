@@ -2,11 +2,26 @@ import port.linkedin_extraction_functions as ef
 
 # defines which extraction functions are used and what titles are displayed
 # patterns are the exact filenames found in the LinkedIn export
+# chunksize (optional) reads the file in DataFrames of that many rows, for files that
+# can be too large to load at once. Every chunk is added to a chunk_counter (e.g.
+# MessageCounts) as it is read, and the counter is passed to the extraction function
+# columns (optional) lists the column name parts the extraction function probes for
+# (in all languages); only matching columns are parsed
 
 extraction_dict = {
     "connections": {
         "extraction_function": ef.extract_connections,
         "patterns": ["Connections.csv"],
+        "columns": [
+            "Connect",
+            "Date",
+            "First Name",
+            "Last Name",
+            "URL",
+            "Email Address",
+            "Company",
+            "Position",
+        ],
         "title": {
             "en": "How many connections have you made per day and what information do they have?",
             "de": "Wie viele Verbindungen haben Sie pro Tag hergestellt und welche Informationen haben diese?",
@@ -16,6 +31,7 @@ extraction_dict = {
     "comments": {
         "extraction_function": ef.extract_comments,
         "patterns": ["Comments.csv"],
+        "columns": ["Date", "Zeit", "Datum"],
         "title": {
             "en": "How many comments have you made per day?",
             "de": "Wie viele Kommentare haben Sie pro Tag geschrieben?",
@@ -25,6 +41,7 @@ extraction_dict = {
     "reactions": {
         "extraction_function": ef.extract_reactions,
         "patterns": ["Reactions.csv"],
+        "columns": ["Date", "Time", "Type", "Typ", "Reaction"],
         "title": {
             "en": "What types of reactions have you given and how often per day?",
             "de": "Welche Arten von Reaktionen haben Sie gegeben und wie oft pro Tag?",
@@ -34,6 +51,7 @@ extraction_dict = {
     "shares": {
         "extraction_function": ef.extract_shares,
         "patterns": ["Shares.csv"],
+        "columns": ["Date", "Zeit", "Datum"],
         "title": {
             "en": "How many posts have you shared per day?",
             "de": "Wie viele Beiträge haben Sie pro Tag geteilt?",
@@ -43,6 +61,9 @@ extraction_dict = {
     "messages": {
         "extraction_function": ef.extract_messages,
         "patterns": ["messages.csv"],
+        "chunksize": 50000,
+        "chunk_counter": ef.MessageCounts,
+        "columns": ["DATE", "DATUM", "FROM", "VON", "SENDER"],
         "title": {
             "en": "How many messages have you exchanged per day and with how many people?",
             "de": "Wie viele Nachrichten haben Sie pro Tag ausgetauscht und mit wie vielen Personen?",
@@ -52,6 +73,7 @@ extraction_dict = {
     "search_queries": {
         "extraction_function": ef.extract_search_queries,
         "patterns": ["SearchQueries.csv"],
+        "columns": ["Time", "Zeit", "Date"],
         "title": {
             "en": "How many searches have you performed per day?",
             "de": "Wie viele Suchanfragen haben Sie pro Tag durchgeführt?",
@@ -61,6 +83,7 @@ extraction_dict = {
     "interests": {
         "extraction_function": ef.extract_interests,
         "patterns": ["Ad_Targeting.csv"],
+        "columns": ["Interest", "Member Skills"],
         "title": {
             "en": "What interests has LinkedIn inferred about you?",
             "de": "Welche Interessen hat LinkedIn über Sie abgeleitet?",
@@ -88,6 +111,20 @@ extraction_dict = {
     "positions": {
         "extraction_function": ef.extract_positions,
         "patterns": ["Positions.csv"],
+        "columns": [
+            "Company",
+            "Firma",
+            "Title",
+            "Titel",
+            "Description",
+            "Beschreibung",
+            "Location",
+            "Standort",
+            "Started",
+            "Begonnen",
+            "Finished",
+            "Beendet",
+        ],
         "title": {
             "en": "What details are included in your job positions?",
             "de": "Welche Details sind in Ihren beruflichen Positionen enthalten?",
@@ -106,6 +143,7 @@ extraction_dict = {
     "saved_jobs": {
         "extraction_function": ef.extract_saved_jobs,
         "patterns": ["Saved Jobs.csv"],
+        "columns": ["Date", "Datum"],
         "title": {
             "en": "How many jobs have you saved per day?",
             "de": "Wie viele Jobs haben Sie pro Tag gespeichert?",
@@ -0,0 +1,145 @@
+import tracemalloc
+
+############################
+# Per-entry extraction metrics
+############################
+
+# extract_data records for every extraction_dict entry where its time went and how
+# much it read, as ("metrics", record) items of meta_data. The records can be donated
+# along with the data (see DONATE_METRICS in port.script), to find the slow extractors
+# across real exports. Only then does prompt_consent also add the time and size of
+# serializing the resulting table, which costs an extra serialization per table.
+#
+# Optionally (PROBE_MEMORY in port.script) every entry and the consent page build
+# also run under a MemoryProbe, which records with tracemalloc how much memory the
+# step allocated at its peak and how much of it is still allocated afterwards.
+
+
+def entry_metrics(archive, platform, key, members):
+    """
+    Metrics record of an extraction_dict entry, with the sizes of its members
+
+    Times are in seconds:
+    - decompress_seconds: reading and decompressing members
+    - parse_seconds: turning the decompressed members into the extractor's input
+    - extract_seconds: the extraction function, without decompression
+    - serialize_seconds: formatting and serializing the table, set by prompt_consent
+      when measuring (output_bytes likewise)
+    """
+    names = {name for _, name in members}
+    infos = [archive.getinfo(name) for name in names]
+    return {
+        "platform": platform,
+        "entry": key,
+        "members": len(names),
+        "compressed_bytes": sum(info.compress_size for info in infos),
+        "uncompressed_bytes": sum(info.file_size for info in infos),
+        "decompress_seconds": 0.0,
+        "parse_seconds": 0.0,
+        "extract_seconds": 0.0,
+        "serialize_seconds": None,
+        "rows": None,
+        "output_bytes": None,
+    }
+
+
+def lookup_metrics(archive, platform, seconds):
+    """Metrics record of resolving the members of all entries of a platform"""
+    return {
+        "platform": platform,
+        "entry": None,
+        "step": "lookup",
+        "indexed_members": len(archive.namelist()),
+        "lookup_seconds": seconds,
+    }
+
+
+def metrics_records(meta_data):
+    """The metrics records in meta_data (may be None), in the order they were added"""
+    return [value for kind, value in meta_data or () if kind == "metrics"]
+
+
+class MemoryProbe:
+    """Memory allocated by a processing step, measured with tracemalloc
+
+    The step runs between `start` and `stop`, or inside a with statement. Tracing
+    is started by `start`, unless it is already running, and stopped again by
+    `stop`. Allocations are counted in all tracemalloc
+    domains, so numpy array data is included.
+
+    Work that is not part of the step, such as rendering a progress update while
+    the step is suspended, goes between `pause` and `resume`. tracemalloc keeps
+    tracing (stopping it would forget the step's allocations), but what is
+    allocated in between does not count towards the peak, and what it keeps
+    allocated does not count as retained.
+
+    Attributes:
+        enabled: if False the probe does nothing and records nothing
+        peak_bytes: highest memory allocated during the step, above the start
+        retained_bytes: memory allocated during the step and still in use after it
+    """
+
+    __slots__ = (
+        "enabled",
+        "peak_bytes",
+        "retained_bytes",
+        "_start",
+        "_started",
+        "_peak",
+        "_excluded",
+        "_paused_at",
+    )
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.peak_bytes = None
+        self.retained_bytes = None
+        self._start = 0
+        self._started = False
+        self._peak = 0  # peak before the last pause, above the start
+        self._excluded = 0  # memory still allocated by the paused work
+        self._paused_at = 0
+
+    def start(self):
+        if self.enabled:
+            self._started = not tracemalloc.is_tracing()
+            if self._started:
+                tracemalloc.start()
+            self._start = tracemalloc.get_traced_memory()[0]
+            self._peak = 0
+            self._excluded = 0
+            tracemalloc.reset_peak()
+
+    def pause(self):
+        if self.enabled:
+            current, peak = tracemalloc.get_traced_memory()
+            self._peak = max(self._peak, peak - self._start - self._excluded)
+            self._paused_at = current
+
+    def resume(self):
+        if self.enabled:
+            self._excluded += tracemalloc.get_traced_memory()[0] - self._paused_at
+            tracemalloc.reset_peak()
+
+    def stop(self):
+        if self.enabled:
+            current, peak = tracemalloc.get_traced_memory()
+            self.peak_bytes = max(self._peak, peak - self._start - self._excluded)
+            self.retained_bytes = current - self._start - self._excluded
+            if self._started:
+                tracemalloc.stop()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+    def record(self, metrics):
+        """Add the measurements to a metrics record, if the probe is enabled"""
+        if self.enabled:
+            metrics["peak_bytes"] = self.peak_bytes
+            metrics["retained_bytes"] = self.retained_bytes
+        return metrics
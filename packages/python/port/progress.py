@@ -0,0 +1,151 @@
+import time
+
+############################
+# Progress weighted by the work of each entry
+############################
+
+# A few members (impression histories, messages, watch history) take almost all of
+# the extraction time. Progress is therefore weighted by the uncompressed size of the
+# members every extraction_dict entry reads, known from the central directory before
+# anything is decompressed. Streaming readers report how many bytes of their members
+# they have processed, so progress also moves while a single large member is read.
+#
+# Every update that reaches process() becomes a rendered page sent through the
+# Pyodide bridge. ProgressEmitter drops updates that come too soon after the last one,
+# so many small files share one render and a large member reports a few times.
+
+# Fixed cost of an entry, so that missing and tiny files still move the bar
+ENTRY_COST = 1 << 16
+
+
+def plan_progress(archive, manifest, schedule):
+    """
+    Expected work of every manifest entry, in bytes
+
+    A member read by several entries is counted for the first one in schedule
+    order, the others reuse its parsed content.
+
+    Parameters:
+    - archive: ArchiveSession of the uploaded zip file
+    - manifest: entry key -> (pattern, member name) pairs, see resolve_manifest
+    - schedule: entry keys in processing order, see schedule_manifest
+
+    Returns:
+    - dict mapping each entry key to its cost
+    """
+    counted = set()
+    costs = {}
+    for key in schedule:
+        cost = ENTRY_COST
+        for _, name in manifest[key]:
+            if name not in counted:
+                counted.add(name)
+                cost += archive.getinfo(name).file_size
+        costs[key] = cost
+    return costs
+
+
+class Progress:
+    """Share of the planned work that is done
+
+    Attributes:
+        costs: entry key -> expected work in bytes, see plan_progress
+        total: sum of all costs
+        done: work of the finished entries
+        current: work done so far in the entry being processed
+        paused: seconds the current entry was suspended while its updates were
+            rendered, see report_progress
+    """
+
+    __slots__ = "costs", "total", "done", "current", "paused", "_key"
+
+    def __init__(self, costs):
+        self.costs = costs
+        self.total = sum(costs.values()) or 1
+        self.done = 0
+        self.current = 0
+        self.paused = 0.0
+        self._key = None
+
+    def start(self, key):
+        self._key = key
+        self.current = 0
+        self.paused = 0.0
+
+    def update(self, processed):
+        """Bytes of the current entry's members processed so far"""
+        self.current = min(processed, self.costs[self._key])
+
+    def finish(self):
+        self.done += self.costs[self._key]
+        self.current = 0
+        self._key = None
+
+    @property
+    def percentage(self):
+        return (self.done + self.current) / self.total * 100
+
+
+class ProgressEmitter:
+    """Decides which progress updates are rendered
+
+    An update is emitted when at least min_interval seconds have passed and the
+    percentage has grown by at least min_delta points since the last emitted one.
+    The first update is always emitted.
+    """
+
+    __slots__ = "min_interval", "min_delta", "_time", "_percentage"
+
+    def __init__(self, min_interval=0.2, min_delta=1.0):
+        self.min_interval = min_interval
+        self.min_delta = min_delta
+        self._time = None
+        self._percentage = None
+
+    def due(self, percentage):
+        """Whether an update at percentage should be emitted, recording it if so"""
+        now = time.monotonic()
+        if self._time is not None and (
+            now - self._time < self.min_interval
+            or percentage - self._percentage < self.min_delta
+        ):
+            return False
+        self._time = now
+        self._percentage = percentage
+        return True
+
+
+def report_progress(steps, progress, emitter, message, data, probe=None):
+    """
+    Run a streaming reader, yielding extract_data progress updates as it advances
+
+    steps is a generator that yields the number of bytes it has processed and
+    returns its result; updates are filtered by emitter (a ProgressEmitter). Use
+    as `result = yield from report_progress(...)`. The time spent rendering an
+    update is added to progress.paused, and the memory probe of the step
+    (port.metrics.MemoryProbe), if given, is paused meanwhile.
+    """
+    while True:
+        try:
+            processed = next(steps)
+        except StopIteration as stop:
+            return stop.value
+        progress.update(processed)
+        if emitter.due(progress.percentage):
+            paused = time.perf_counter()
+            if probe is not None:
+                probe.pause()
+            yield message, progress.percentage, data
+            if probe is not None:
+                probe.resume()
+            progress.paused += time.perf_counter() - paused
+
+
+def offset_steps(steps, offset):
+    """Add offset to the byte counts of a streaming reader, keeping its result"""
+    while True:
+        try:
+            processed = next(steps)
+        except StopIteration as stop:
+            return stop.value
+        yield offset + processed
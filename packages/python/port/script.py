@@ -14,13 +14,44 @@ from port.youtube_extraction_functions import *
 from port.youtube_extraction_functions_dict import (
     extraction_dict as youtube_extraction_dict,
 )
+from port.archive import (
+    ArchiveSession,
+    member_offset,
+    parsed_size,
+    resolve_manifest,
+    schedule_manifest,
+)
+from port.json_stream import iter_array
+from port.csv_stream import CsvReader
+from port.date_parsing import reset_date_formats
+from port.day_histogram import day_histogram, format_day_columns
+from port.metrics import MemoryProbe, entry_metrics, lookup_metrics, metrics_records
+from port.progress import (
+    Progress,
+    ProgressEmitter,
+    offset_steps,
+    plan_progress,
+    report_progress,
+)
 
+import array
+import collections
+import functools
 import zipfile
 import numpy as np
 import pandas as pd
 import time
 import json
 import os
+import re
+
+# Also donate the extraction metrics recorded in meta_data (see port.metrics) when
+# the participant consents to donating the data
+DONATE_METRICS = False
+
+# Measure the memory allocated by every extraction_dict entry and by the consent page
+# (see port.metrics.MemoryProbe). Tracing slows down extraction, so it is opt-in
+PROBE_MEMORY = False
 
 ############################
 # MAIN FUNCTION INITIATING THE DONATION PROCESS
@@ -36,6 +67,7 @@ def process(sessionId):
     # STEP 1: Select DDP and extract automatically required data
     data = None
     platform = None
+    archive = None
 
     while True:
         meta_data.append(("debug", f"{key}: prompt file"))
@@ -46,8 +78,13 @@ def process(sessionId):
 
         # If user input
         if fileResult.__type__ == "PayloadString":
+            # Open the archive once and share it across all following steps
+            if archive is not None:
+                archive.close()
+            archive = ArchiveSession(fileResult.value)
+
             # First, identify which platform the data is from
-            platform = identify_platform(fileResult.value)
+            platform = identify_platform(archive)
             meta_data.append(
                 (
                     "debug",
@@ -56,13 +93,14 @@ def process(sessionId):
             )
 
             if platform == "instagram":
-                check_ddp = check_if_valid_instagram_ddp(fileResult.value)
+                check_ddp = check_if_valid_instagram_ddp(archive)
             elif platform == "linkedin":
-                check_ddp = check_if_valid_linkedin_ddp(fileResult.value)
+                check_ddp = check_if_valid_linkedin_ddp(archive)
             elif platform == "youtube":
-                check_ddp = check_if_valid_youtube_ddp(fileResult.value)
+                check_ddp = check_if_valid_youtube_ddp(archive)
             else:
                 # If platform could not be identified
+                archive.close()
                 meta_data.append(
                     ("debug", f"{key}: unknown platform, cannot process file")
                 )
@@ -75,13 +113,17 @@ def process(sessionId):
                 else:
                     break
 
+            if check_ddp != "valid":
+                # Release the upload before asking for another file
+                archive.close()
+
             if check_ddp == "valid":
                 meta_data.append(
                     ("debug", f"{key}: extracting file for platform {platform}")
                 )
 
                 # Use the unified extract_data function with platform parameter
-                extract_gen = extract_data(fileResult.value, locale, platform)
+                extract_gen = extract_data(archive, locale, platform, meta_data)
 
                 while True:
                     try:
@@ -95,6 +137,8 @@ def process(sessionId):
                         # The generator is exhausted, break the loop
                         break
 
+                archive.close()
+
                 meta_data.append(
                     ("debug", f"{key}: extraction successful, go to consent form")
                 )
@@ -160,6 +204,11 @@ def process(sessionId):
         if consent_result.__type__ == "PayloadJSON":
             meta_data.append(("debug", f"{key}: donate consent data"))
             yield donate(f"{sessionId}-{key}", consent_result.value)
+            if DONATE_METRICS:
+                yield donate(
+                    f"{sessionId}-{key}-metrics",
+                    json.dumps(metrics_records(meta_data)),
+                )
 
         # Send no data if no consent
         if consent_result.__type__ == "PayloadFalse":
@@ -167,14 +216,14 @@ def process(sessionId):
             yield donate(f"{sessionId}-{key}", value)
 
 
-def identify_platform(filename):
+def identify_platform(archive):
     """
     Identify the platform based on the filename of the uploaded zip file.
     Returns: "instagram", "linkedin", "youtube", or None if not identified
     """
     try:
         # Get the name of the zip file (without path)
-        zip_name = os.path.basename(filename)
+        zip_name = os.path.basename(archive.filename)
 
         if zip_name.startswith("instagram-"):
             return "instagram"
@@ -186,21 +235,22 @@ def identify_platform(filename):
             return "youtube"
 
         # If filename pattern doesn't match, try to check contents as a fallback
-        with zipfile.ZipFile(filename, "r") as zip_ref:
-            file_list = zip_ref.namelist()
-            first_level_entries = {entry.split("/")[0] for entry in file_list if entry}
+        directories = archive.index.by_directory
+        root_files = directories.get("", [])
+        first_level_entries = {d.split("/")[0] for d in directories if d}
+        first_level_entries.update(root_files)
 
-            # Check first level entries for platform-specific indicators
-            if "ads_information" in first_level_entries:
-                return "instagram"
+        # Check first level entries for platform-specific indicators
+        if "ads_information" in first_level_entries:
+            return "instagram"
 
-            # LinkedIn typically has these files at root level
-            if "Profile.csv" in file_list:
-                return "linkedin"
+        # LinkedIn typically has these files at root level
+        if "Profile.csv" in root_files:
+            return "linkedin"
 
-            # YouTube/Google Takeout has a specific folder structure
-            if "Takeout" in first_level_entries:
-                return "youtube"
+        # YouTube/Google Takeout has a specific folder structure
+        if "Takeout" in first_level_entries:
+            return "youtube"
 
     except zipfile.BadZipFile:
         print("Invalid ZIP file.")
@@ -210,41 +260,40 @@ def identify_platform(filename):
     return None
 
 
-def check_if_valid_instagram_ddp(filename):
+def check_if_valid_instagram_ddp(archive):
     """Check if the uploaded file is a valid Instagram data download package"""
     folder_name_check_ddp = "ads_information"
     file_name_check_html = "start_here.html"
 
     try:
-        with zipfile.ZipFile(filename, "r") as zip_ref:
-            found_folder_name_check_ddp = False
-            found_file_name_check_html = False
+        found_folder_name_check_ddp = False
+        found_file_name_check_html = False
 
-            for file_info in zip_ref.infolist():
-                if folder_name_check_ddp in file_info.filename:
-                    found_folder_name_check_ddp = True
+        for file_info in archive.infolist():
+            if folder_name_check_ddp in file_info.filename:
+                found_folder_name_check_ddp = True
 
-                if file_name_check_html in file_info.filename:
-                    found_file_name_check_html = True
+            if file_name_check_html in file_info.filename:
+                found_file_name_check_html = True
 
-            if found_folder_name_check_ddp:
-                if found_file_name_check_html:
-                    print(
-                        f"Folder '{folder_name_check_ddp}' found and file '{file_name_check_html}' found in the ZIP file. Seems like a Instagram HTML DDP."
-                    )
-                    return "invalid_no_json"
-
-                else:
-                    print(
-                        f"Folder '{folder_name_check_ddp}' found and file '{file_name_check_html}' not found in the ZIP file. Seems like a real Instagram JSON DDP."
-                    )
-                    return "valid"
+        if found_folder_name_check_ddp:
+            if found_file_name_check_html:
+                print(
+                    f"Folder '{folder_name_check_ddp}' found and file '{file_name_check_html}' found in the ZIP file. Seems like a Instagram HTML DDP."
+                )
+                return "invalid_no_json"
 
             else:
                 print(
-                    f"Folder '{folder_name_check_ddp}' not found. Does not seem like an Instagram DDP."
+                    f"Folder '{folder_name_check_ddp}' found and file '{file_name_check_html}' not found in the ZIP file. Seems like a real Instagram JSON DDP."
                 )
-                return "invalid_no_ddp"
+                return "valid"
+
+        else:
+            print(
+                f"Folder '{folder_name_check_ddp}' not found. Does not seem like an Instagram DDP."
+            )
+            return "invalid_no_ddp"
 
     except zipfile.BadZipFile:
         print("Invalid ZIP file.")
@@ -255,7 +304,7 @@ def check_if_valid_instagram_ddp(filename):
         return "invalid_file_error"
 
 
-def check_if_valid_linkedin_ddp(filename):
+def check_if_valid_linkedin_ddp(archive):
     """Check if the uploaded file is a valid LinkedIn data download package"""
     file_name_check_ddp = "Profile.csv"
     ddp_name_check_complete = "Complete_LinkedInDataExport"
@@ -263,32 +312,31 @@ def check_if_valid_linkedin_ddp(filename):
     found_ddp_name_check_complete = False
     found_file_name_check_ddp = False
 
-    if ddp_name_check_complete in filename:
+    if ddp_name_check_complete in archive.filename:
         found_ddp_name_check_complete = True
 
     try:
-        with zipfile.ZipFile(filename, "r") as zip_ref:
-            for file_info in zip_ref.infolist():
-                if file_name_check_ddp in file_info.filename:
-                    found_file_name_check_ddp = True
-
-            if found_file_name_check_ddp:
-                if found_ddp_name_check_complete:
-                    print(
-                        f"Folder '{file_name_check_ddp}' found and ZIP file with '{ddp_name_check_complete}'. Seems like a real Complete LinkedIn DDP."
-                    )
-                    return "valid"
-                else:
-                    print(
-                        f"Folder '{file_name_check_ddp}' found but ZIP file does not start with '{ddp_name_check_complete}'. Seems like a Basic LinkedIn DDP."
-                    )
-                    return "invalid_no_json"
+        for file_info in archive.infolist():
+            if file_name_check_ddp in file_info.filename:
+                found_file_name_check_ddp = True
 
+        if found_file_name_check_ddp:
+            if found_ddp_name_check_complete:
+                print(
+                    f"Folder '{file_name_check_ddp}' found and ZIP file with '{ddp_name_check_complete}'. Seems like a real Complete LinkedIn DDP."
+                )
+                return "valid"
             else:
                 print(
-                    f"Folder '{file_name_check_ddp}' not found. Does not seem like an LinkedIn DDP."
+                    f"Folder '{file_name_check_ddp}' found but ZIP file does not start with '{ddp_name_check_complete}'. Seems like a Basic LinkedIn DDP."
                 )
-                return "invalid_no_ddp"
+                return "invalid_no_json"
+
+        else:
+            print(
+                f"Folder '{file_name_check_ddp}' not found. Does not seem like an LinkedIn DDP."
+            )
+            return "invalid_no_ddp"
 
     except zipfile.BadZipFile:
         print("Invalid ZIP file.")
@@ -299,7 +347,7 @@ def check_if_valid_linkedin_ddp(filename):
         return "invalid_file_error"
 
 
-def check_if_valid_youtube_ddp(filename):
+def check_if_valid_youtube_ddp(archive):
     """Check if the uploaded file is a valid YouTube data download package"""
     folder_name_check_ddp = [
         "YouTube und YouTube Music",
@@ -311,41 +359,39 @@ def check_if_valid_youtube_ddp(filename):
     ]  # language sensitive
 
     try:
-        with zipfile.ZipFile(filename, "r") as zip_ref:
-            found_folder_name_check_ddp = False
-            found_file_name_check_html = False
-
-            for file_info in zip_ref.infolist():
-                if any(
-                    folder_name in file_info.filename
-                    for folder_name in folder_name_check_ddp
-                ):
-                    found_folder_name_check_ddp = True
-
-                if any(
-                    file_name in file_info.filename
-                    for file_name in file_name_check_html
-                ):
-                    found_file_name_check_html = True
-
-            if found_folder_name_check_ddp:
-                if found_file_name_check_html:
-                    print(
-                        f"Folder '{folder_name_check_ddp}' found and file '{file_name_check_html}' found in the ZIP file. Seems like a YouTube HTML DDP."
-                    )
-                    return "invalid_no_json"
-
-                else:
-                    print(
-                        f"Folder '{folder_name_check_ddp}' found and file '{file_name_check_html}' not found in the ZIP file. Seems like a real YouTube JSON DDP."
-                    )
-                    return "valid"
+        found_folder_name_check_ddp = False
+        found_file_name_check_html = False
+
+        for file_info in archive.infolist():
+            if any(
+                folder_name in file_info.filename
+                for folder_name in folder_name_check_ddp
+            ):
+                found_folder_name_check_ddp = True
+
+            if any(
+                file_name in file_info.filename for file_name in file_name_check_html
+            ):
+                found_file_name_check_html = True
+
+        if found_folder_name_check_ddp:
+            if found_file_name_check_html:
+                print(
+                    f"Folder '{folder_name_check_ddp}' found and file '{file_name_check_html}' found in the ZIP file. Seems like a YouTube HTML DDP."
+                )
+                return "invalid_no_json"
 
             else:
                 print(
-                    f"Folder '{folder_name_check_ddp}' not found. Does not seem like an YouTube DDP."
+                    f"Folder '{folder_name_check_ddp}' found and file '{file_name_check_html}' not found in the ZIP file. Seems like a real YouTube JSON DDP."
                 )
-                return "invalid_no_ddp"
+                return "valid"
+
+        else:
+            print(
+                f"Folder '{folder_name_check_ddp}' not found. Does not seem like an YouTube DDP."
+            )
+            return "invalid_no_ddp"
 
     except zipfile.BadZipFile:
         print("Invalid ZIP file.")
@@ -356,15 +402,18 @@ def check_if_valid_youtube_ddp(filename):
         return "invalid_file_error"
 
 
-def extract_data(filename, locale, platform):
+def extract_data(archive, locale, platform, meta_data=None, probe_memory=PROBE_MEMORY):
     """
     Takes a zip folder, extracts relevant content based on the platform,
     then extracts & processes relevant information and returns them as dataframes
 
     Parameters:
-    - filename: path to the zip file
+    - archive: ArchiveSession of the uploaded zip file
     - locale: language locale (e.g., "en", "de", "nl")
     - platform: "instagram", "linkedin", or "youtube"
+    - meta_data: optional list that receives debug information and a metrics
+      record per entry (see port.metrics)
+    - probe_memory: also record the peak and retained memory of every entry
 
     Returns:
     - Generator that yields progress updates and extracted data
@@ -382,24 +431,121 @@ def extract_data(filename, locale, platform):
         extraction_dict = youtube_extraction_dict
         platform_name = "YouTube"
 
-    for index, (file, entry) in enumerate(extraction_dict.items(), start=1):
-        # Get list of possible file names (sometimes language sensitive)
-        patterns = entry.get("patterns", [file])
+    # Date formats inferred for an earlier upload may not fit this one
+    reset_date_formats()
+
+    # Resolve all files up front, so missing ones are known before decompression
+    lookup_start = time.perf_counter()
+    manifest = resolve_members(archive, extraction_dict, platform)
+    if meta_data is not None:
+        meta_data.append(
+            (
+                "metrics",
+                lookup_metrics(archive, platform, time.perf_counter() - lookup_start),
+            )
+        )
 
-        # Extract content based on platform
-        if platform == "instagram":
-            file_content, matched_pattern = extract_instagram_content_from_zip_folder(
-                filename, file, patterns
+    # Files read by several entries are parsed once (see ArchiveSession.read)
+    readers = collections.Counter(
+        name for members in manifest.values() for name in {name for _, name in members}
+    )
+    archive.share(name for name, count in readers.items() if count > 1)
+    missing = [file for file, members in manifest.items() if not members]
+    if missing:
+        print(f"No files found for {platform}: {missing}")
+        if meta_data is not None:
+            meta_data.append(
+                ("debug", f"{platform}: no files found for {', '.join(missing)}")
+            )
+
+    translatedMessage = props.Translatable(
+        {
+            "en": f"{len(extraction_dict) - len(missing)} of {len(extraction_dict)} {platform_name} files found",
+            "de": f"{len(extraction_dict) - len(missing)} von {len(extraction_dict)} {platform_name}-Dateien gefunden",
+            "nl": f"{len(extraction_dict) - len(missing)} van {len(extraction_dict)} {platform_name} bestanden gevonden",
+        }
+    )
+    # Updates arriving in quick succession are rendered once (see ProgressEmitter)
+    emitter = ProgressEmitter()
+    emitter.due(0)
+    yield translatedMessage.translations[locale], 0, data
+
+    # Entries are processed in archive order (one forward sweep over the zip) and
+    # their results are put back in extraction_dict order at the end
+    results = {}
+    schedule = schedule_manifest(archive, manifest)
+
+    # Progress is weighted by the uncompressed size of the members of each entry
+    progress = Progress(plan_progress(archive, manifest, schedule))
+
+    translatedMessage = props.Translatable(
+        {
+            "en": f"Data extraction from {platform_name} file: ",
+            "de": f"Daten-Extrahierung aus der {platform_name}-Datei: ",
+            "nl": f"Gegevens extractie uit het {platform_name} bestand: ",
+        }
+    )
+
+    for file in schedule:
+        entry = extraction_dict[file]
+        message = f"{translatedMessage.translations[locale]}{file}"
+        progress.start(file)
+
+        # Members resolved for this entry, in the order they are tried
+        members = manifest[file]
+
+        # Time and memory spent rendering progress updates are not counted
+        # (Progress.paused, MemoryProbe.pause)
+        probe = MemoryProbe(probe_memory)
+        probe.start()
+        metrics = entry_metrics(archive, platform, file, members)
+        read_seconds = archive.read_seconds
+        clock = time.perf_counter()
+
+        # Extract content based on platform. Streaming readers report progress
+        # while they read a member
+        if not members:
+            file_content, matched_pattern = None, None
+        elif platform == "instagram":
+            file_content, matched_pattern = yield from report_progress(
+                extract_instagram_content_from_zip_folder(archive, file, members),
+                progress,
+                emitter,
+                message,
+                data,
+                probe,
             )
         elif platform == "linkedin":
-            file_content, matched_pattern = extract_linkedin_content_from_zip_folder(
-                filename, patterns
+            file_content, matched_pattern = yield from report_progress(
+                extract_linkedin_content_from_zip_folder(
+                    archive,
+                    members,
+                    entry.get("chunksize"),
+                    entry.get("columns"),
+                    entry.get("chunk_counter"),
+                ),
+                progress,
+                emitter,
+                message,
+                data,
+                probe,
             )
         elif platform == "youtube":
-            file_content, matched_pattern = extract_youtube_content_from_zip_folder(
-                filename, patterns
+            file_content, matched_pattern = yield from report_progress(
+                extract_youtube_content_from_zip_folder(archive, members),
+                progress,
+                emitter,
+                message,
+                data,
+                probe,
             )
 
+        content_seconds = time.perf_counter() - clock - progress.paused
+        content_read_seconds = archive.read_seconds - read_seconds
+        metrics["parse_seconds"] = content_seconds - content_read_seconds
+        read_seconds = archive.read_seconds
+        clock = time.perf_counter()
+
         if file_content is not None:
             try:
                 # Call the extraction function with content
@@ -442,22 +588,26 @@ def extract_data(filename, locale, platform):
                 columns=[translatedMessage2.translations[locale]],
             )
 
-        data.append(file_df)
+        # Extraction functions may still read from the archive
+        extract_read_seconds = archive.read_seconds - read_seconds
+        metrics["extract_seconds"] = time.perf_counter() - clock - extract_read_seconds
+        metrics["decompress_seconds"] = content_read_seconds + extract_read_seconds
+        metrics["rows"] = len(file_df)
 
-        # Yield progress update
-        translatedMessage = props.Translatable(
-            {
-                "en": f"Data extraction from {platform_name} file: ",
-                "de": f"Daten-Extrahierung aus der {platform_name}-Datei: ",
-                "nl": f"Gegevens extractie uit het {platform_name} bestand: ",
-            }
-        )
+        # Retained memory is measured once the input of the extractor is released
+        file_content = None
+        probe.stop()
+        if meta_data is not None:
+            meta_data.append(("metrics", probe.record(metrics)))
 
-        yield (
-            f"{translatedMessage.translations[locale]}{file}",
-            (index / len(extraction_dict)) * 100,
-            data,
-        )
+        results[file] = file_df
+
+        # Yield progress update, unless one was rendered moments ago
+        progress.finish()
+        if emitter.due(progress.percentage):
+            yield message, progress.percentage, data
+
+    data.extend(results[file] for file in extraction_dict)
 
     # Yield final progress update and the extracted data
     translatedMessage = props.Translatable(
@@ -470,331 +620,389 @@ def extract_data(filename, locale, platform):
     yield f"{translatedMessage.translations[locale]}", 100, data
 
 
-def extract_instagram_content_from_zip_folder(zip_file_path, file_key, patterns):
+# Long conversations are split into message_1.json, message_2.json, ...
+instagram_message_part = re.compile(
+    r"(?:^|/)(?:inbox|message_requests)/[^/]+/message_\d+\.json$"
+)
+
+
+def resolve_members(archive, extraction_dict, platform):
+    """
+    Resolve the zip members read by every entry of a platform's extraction_dict
+
+    Returns a manifest mapping each entry key to (pattern, member name) pairs,
+    see port.archive.resolve_manifest
+    """
+    if platform == "instagram":
+        manifest = resolve_manifest(archive, extraction_dict, extension=".json")
+
+        # Messages are read from every part of every conversation in inbox and
+        # message_requests, in archive order since all of them are read
+        if "messages" in manifest:
+            manifest["messages"] = sorted(
+                (
+                    ("message_1.json", name)
+                    for name in archive.namelist()
+                    if instagram_message_part.search(name)
+                ),
+                key=lambda member: member_offset(archive, member[1]),
+            )
+        return manifest
+
+    if platform == "linkedin":
+        # LinkedIn patterns are exact file names
+        return resolve_manifest(
+            archive, extraction_dict, extension=".csv", substrings=False
+        )
+
+    return resolve_manifest(archive, extraction_dict)
+
+
+# Impression histories are streamed: pattern -> (top-level array key, keep authors)
+instagram_impression_histories = {
+    "posts_viewed": ("impressions_history_posts_seen", False),
+    "videos_watched": ("impressions_history_videos_watched", False),
+    "ads_viewed": ("impressions_history_ads_seen", True),
+}
+
+
+# Elements a streaming reader parses between two progress reports
+PROGRESS_ELEMENTS = 2000
+
+
+def read_impression_history(json_file, pattern):
+    """
+    Stream an Instagram impression history and keep only the fields the extractors use
+
+    The file is parsed one impression at a time (see port.json_stream), so memory
+    stays flat however large the export is. Generator yielding the number of
+    decompressed bytes read so far (see port.progress), use with
+    ArchiveSession.read_steps.
+
+    Returns:
+    - DataFrame with an int64 "timestamp" column and, for ads_viewed, an "author"
+      column (None where the impression has no author). Impressions without a
+      time are skipped
+    """
+    key, keep_authors = instagram_impression_histories[pattern]
+    timestamps = array.array("q")
+    authors = []
+
+    for count, impression in enumerate(iter_array(json_file, key), start=1):
+        if count % PROGRESS_ELEMENTS == 0:
+            yield json_file.tell()
+        string_map_data = impression.get("string_map_data") or {}
+        timestamp = (string_map_data.get("Time") or {}).get("timestamp")
+        if timestamp is None:
+            continue
+        timestamps.append(int(timestamp))
+        if keep_authors:
+            authors.append((string_map_data.get("Author") or {}).get("value"))
+
+    impressions = pd.DataFrame({"timestamp": np.frombuffer(timestamps, dtype=np.int64)})
+    if keep_authors:
+        impressions["author"] = pd.Series(authors, dtype=object)
+    return impressions
+
+
+# One parser object per history, so ArchiveSession caches what it parsed for reuse
+impression_history_parsers = {
+    pattern: functools.partial(read_impression_history, pattern=pattern)
+    for pattern in instagram_impression_histories
+}
+
+
+def read_outgoing_messages(archive, members):
+    """
+    Count the messages the participant sent per day, over all conversation parts
+
+    Every part is streamed (see port.json_stream) and its outgoing messages are
+    added to the per-day totals before the next part is read, so memory depends on
+    the number of days and the size of one part, not on all messages. The
+    participant is the second entry of the participants of a conversation; parts
+    without two participants are skipped.
+
+    Generator yielding the number of decompressed bytes read so far (see
+    port.progress).
+
+    Returns:
+    - collections.Counter mapping day numbers (see epochs_to_days) to the number
+      of messages sent that day
+    """
+    daily_counts = collections.Counter()
+    processed = 0
+
+    for _, message_file in members:
+        yield processed
+        processed += archive.getinfo(message_file).file_size
+        try:
+            timestamps = []
+            with archive.open(message_file) as json_file:
+                header = {}
+                user_name = None
+                for message in iter_array(json_file, "messages", header=header):
+                    if user_name is None:
+                        participants = header.get("participants") or []
+                        if len(participants) < 2:
+                            break
+                        user_name = participants[1]["name"]
+                    if (
+                        message.get("sender_name") == user_name
+                        and "timestamp_ms" in message
+                    ):
+                        timestamps.append(message["timestamp_ms"])
+
+            days, counts = day_histogram(epochs_to_days(timestamps, unit="ms"))
+            daily_counts.update(dict(zip(days.tolist(), counts.tolist())))
+        except Exception as e:
+            print(f"Error reading message file {message_file}: {e}")
+
+    return daily_counts
+
+
+def extract_instagram_content_from_zip_folder(archive, file_key, members):
     """
     Extract JSON content from Instagram data export zip file based on the file key.
 
     Parameters:
-    - zip_file_path: Path to the zip file
+    - archive: ArchiveSession of the uploaded zip file
     - file_key: The key from extraction_dict (e.g., 'messages', 'time_spent')
-    - patterns: File patterns to look for (used as fallback)
+    - members: (pattern, member name) pairs resolved for file_key, in the order
+      they are tried
+
+    Generator yielding the number of decompressed bytes read so far (see
+    port.progress), returns (content, matched pattern).
 
     Special handling for:
-    1. Message files - combines all conversations
-    2. Time spent/sessions - loads posts_viewed and/or videos_watched
+    1. Message files - outgoing messages of all conversations counted per day,
+       see read_outgoing_messages
+    2. Time spent/sessions - posts_viewed and/or videos_watched sessionized per
+       day, once for both entries (kept in the archive's cache)
+    3. Impression histories - streamed into compact frames, see read_impression_history
     """
     try:
-        with zipfile.ZipFile(zip_file_path, "r") as zip_ref:
-            # Get the list of file names in the zip file
-            file_names = zip_ref.namelist()
-
-            # Special handling for messages
-            if file_key == "messages":
-                # This is for messages - we need to find all message files
-                all_messages_data = {"combined_messages": []}
-
-                # Find all message files in the ZIP (look in both inbox and message_requests folders)
-                message_files = []
-                for name in file_names:
-                    if name.endswith("message_1.json") and (
-                        "/inbox/" in name or "/message_requests/" in name
-                    ):
-                        message_files.append(name)
-
-                if not message_files:
-                    print("No message files found")
-                    return None, "message_1.json"
+        # Special handling for messages
+        if file_key == "messages":
+            if not members:
+                print("No message files found")
+                return None, "message_1.json"
+
+            # Outgoing messages of all conversation parts, counted per day
+            daily_counts = yield from read_outgoing_messages(archive, members)
+            return daily_counts, "message_1.json"
+
+        # Special handling for time_spent and session_frequency which need posts_viewed and/or videos_watched
+        if file_key == "time_spent" or file_key == "session_frequency":
+            # The entry processed second reuses the sessions of the first
+            sessions_key = (tuple(name for _, name in members), sessionize)
+            daily_sessions = archive.cache.get(sessions_key)
+            if daily_sessions is not None:
+                return daily_sessions, "combined_viewing_data"
+
+            # We need to load either or both files (first readable match per pattern)
+            viewing_data = {}
+            processed = 0
+
+            for pattern, file_name in members:
+                if pattern in viewing_data:
+                    continue
+                try:
+                    viewing_data[pattern] = yield from offset_steps(
+                        archive.read_steps(
+                            file_name, impression_history_parsers[pattern]
+                        ),
+                        processed,
+                    )
+                except Exception as e:
+                    print(f"Error reading {pattern} file {file_name}: {e}")
+                processed += archive.getinfo(file_name).file_size
+
+            posts_viewed_data = viewing_data.get("posts_viewed")
+            videos_watched_data = viewing_data.get("videos_watched")
+
+            # Sessionize the views of either or both files
+            if posts_viewed_data is not None or videos_watched_data is not None:
+                combined_data = {
+                    "posts_viewed": posts_viewed_data,
+                    "videos_watched": videos_watched_data,
+                }
+                daily_sessions = sessionize(merge_timestamps(combined_data))
+                archive.cache.put(
+                    sessions_key, daily_sessions, parsed_size(daily_sessions, 0)
+                )
+                return daily_sessions, "combined_viewing_data"
+            else:
+                print("Could not find posts_viewed or videos_watched files")
+                return None, "combined_viewing_data"
 
-                for message_file in message_files:
-                    try:
-                        with zip_ref.open(message_file) as json_file:
-                            json_content = json_file.read()
-                            conversation_data = json.loads(json_content)
-
-                            # Only process valid message files with participants
-                            if (
-                                "participants" in conversation_data
-                                and len(conversation_data["participants"]) > 1
-                                and "messages" in conversation_data
-                            ):
-                                # User is typically the second participant
-                                user_name = conversation_data["participants"][1]["name"]
-
-                                # Extract outgoing messages
-                                for message in conversation_data["messages"]:
-                                    if (
-                                        message.get("sender_name") == user_name
-                                        and "timestamp_ms" in message
-                                    ):
-                                        # Add to combined messages
-                                        all_messages_data["combined_messages"].append(
-                                            {
-                                                "timestamp_ms": message["timestamp_ms"],
-                                                "sender_name": "user1",  # Anonymize
-                                                "conversation": message_file.split("/")[
-                                                    -2
-                                                ],  # Get conversation ID
-                                            }
-                                        )
-                    except Exception as e:
-                        print(f"Error reading message file {message_file}: {e}")
-                        continue
-
-                return all_messages_data, "message_1.json"
-
-            # Special handling for time_spent and session_frequency which need posts_viewed and/or videos_watched
-            if file_key == "time_spent" or file_key == "session_frequency":
-                # We need to load either or both files
-                posts_viewed_data = None
-                videos_watched_data = None
-
-                # Find and load posts_viewed.json
-                for file_name in file_names:
-                    if file_name.endswith(".json") and "posts_viewed" in file_name:
-                        try:
-                            with zip_ref.open(file_name) as json_file:
-                                json_content = json_file.read()
-                                posts_viewed_data = json.loads(json_content)
-                                break
-                        except Exception as e:
-                            print(f"Error reading posts_viewed file {file_name}: {e}")
-
-                # Find and load videos_watched.json
-                for file_name in file_names:
-                    if file_name.endswith(".json") and "videos_watched" in file_name:
-                        try:
-                            with zip_ref.open(file_name) as json_file:
-                                json_content = json_file.read()
-                                videos_watched_data = json.loads(json_content)
-                                break
-                        except Exception as e:
-                            print(f"Error reading videos_watched file {file_name}: {e}")
-
-                # Combine the data for the extraction function - work with either or both files
-                if posts_viewed_data or videos_watched_data:
-                    combined_data = {
-                        "posts_viewed": posts_viewed_data or {},
-                        "videos_watched": videos_watched_data or {},
-                    }
-                    return combined_data, "combined_viewing_data"
+        # Regular handling for other files
+        for pattern, file_name in members:
+            try:
+                # Read the JSON file
+                if pattern in instagram_impression_histories:
+                    data = yield from archive.read_steps(
+                        file_name, impression_history_parsers[pattern]
+                    )
                 else:
-                    print("Could not find posts_viewed or videos_watched files")
-                    return None, "combined_viewing_data"
+                    data = archive.read(file_name, json.load)
+                return data, pattern
+            except Exception as e:
+                print(f"Error reading file {file_name}: {e}")
+                continue  # Try the next matching file if there's an error
 
-            # Regular handling for search history
-            if file_key == "search_history":
-                for file_name in file_names:
-                    if (
-                        file_name.endswith(".json")
-                        and "word_or_phrase_searches" in file_name
-                    ):
-                        try:
-                            with zip_ref.open(file_name) as json_file:
-                                json_content = json_file.read()
-                                data = json.loads(json_content)
-                                return data, "word_or_phrase_searches"
-                        except Exception as e:
-                            print(f"Error reading search file {file_name}: {e}")
-
-            # Regular handling for other files
-            for pattern in patterns:
-                for file_name in file_names:
-                    if file_name.endswith(".json") and pattern in file_name:
-                        try:
-                            # Read the JSON file
-                            with zip_ref.open(file_name) as json_file:
-                                json_content = json_file.read()
-                                data = json.loads(json_content)
-                                return data, pattern
-                        except Exception as e:
-                            print(f"Error reading file {file_name}: {e}")
-                            continue  # Try the next matching file if there's an error
-
-            # If we've checked all files and found no match
-            print(f"No file matching pattern '{patterns}' found for key '{file_key}'")
-            return None, None
+        # If all matching files failed
+        print(f"No readable file found for key '{file_key}'")
+        return None, None
 
     except Exception as e:
         print(f"Error extracting Instagram content: {e}")
         return None, None
 
 
-def extract_linkedin_content_from_zip_folder(zip_file_path, patterns):
+def count_linkedin_csv_chunks(archive, file_name, chunksize, columns, counter):
+    """
+    Stream a LinkedIn CSV from the zip in DataFrames of chunksize rows and add
+    each to counter (see chunk_counter in the extraction_dict)
+
+    Generator yielding the number of decompressed bytes read so far (see
+    port.progress), returns the CsvReader (no columns if the file has no header)
+    """
+    with archive.open(file_name) as csv_file:
+        reader = CsvReader(csv_file, columns)
+        for chunk in reader.chunks(chunksize):
+            counter.add(chunk)
+            yield csv_file.tell()
+    print(
+        f"Read {reader.rows} rows of {file_name} in chunks of {chunksize}, "
+        f"skipped {reader.skipped} lines"
+    )
+    return reader
+
+
+def extract_linkedin_content_from_zip_folder(
+    archive, members, chunksize=None, columns=None, chunk_counter=None
+):
     """
     Extract content from LinkedIn data export zip file
+
+    Files are parsed by pd.read_csv, and again by a tolerant reader if pandas
+    rejects them (see port.csv_stream.CsvReader); skipped lines are reported. With
+    a chunksize and chunk_counter (set per entry in the extraction_dict), the file
+    is counted chunk by chunk while it is read and the content is the counter
+    instead of a DataFrame. With columns, only the columns the extraction function
+    reads are parsed.
+
+    Generator yielding the number of decompressed bytes read so far (see
+    port.progress), returns (content, matched pattern).
     """
     try:
-        with zipfile.ZipFile(zip_file_path, "r") as zip_ref:
-            # Get the list of file names in the zip file
-            file_names = zip_ref.namelist()
-
-            # Look for matching files
-            for pattern in patterns:
-                # Create a list of matching files - use exact matching to avoid partial matches
-                matching_files = []
-
-                for file_name in file_names:
-                    # Get just the filename (without directory)
-                    base_name = file_name.split("/")[-1]
-
-                    # Only match if the base name is exactly the pattern
-                    if base_name == pattern:
-                        matching_files.append(file_name)
-
-                # If no exact matches, see if there are any files that end with the pattern
-                if not matching_files:
-                    for file_name in file_names:
-                        if file_name.endswith("/" + pattern):
-                            matching_files.append(file_name)
-
-                # Process the first matching file we found
-                for file_name in matching_files:
-                    try:
-                        # Read the CSV
-                        with zip_ref.open(file_name) as csv_file:
-                            # Handle notes section in LinkedIn CSV files
-                            peek = csv_file.read(50).decode("utf-8", errors="ignore")
-                            csv_file.seek(0)
-
-                            if "Notes:" in peek:
-                                # Skip notes lines until we find the header
-                                lines = []
-                                for line in csv_file:
-                                    decoded = line.decode("utf-8", errors="ignore")
-                                    if "First Name" in decoded or "Email" in decoded:
-                                        lines.append(decoded)
-                                        break
-
-                                # Read the rest of the file
-                                for line in csv_file:
-                                    lines.append(line.decode("utf-8", errors="ignore"))
-
-                                content = "".join(lines)
-                            else:
-                                # No notes, read the whole file
-                                content = csv_file.read().decode(
-                                    "utf-8", errors="ignore"
-                                )
-
-                        # Now that we have the content, try multiple approaches to read it
-                        # Approach 1: Try with standard pandas read_csv with error handling
-                        try:
-                            from io import StringIO
-
-                            df = pd.read_csv(
-                                StringIO(content),
-                                on_bad_lines="skip",  # Skip rows with too many fields
-                                dtype=str,  # Read everything as strings initially
-                                encoding_errors="ignore",  # Ignore encoding errors
-                            )
-                            print(
-                                f"Successfully read {file_name} with standard pandas read_csv, shape: {df.shape}"
-                            )
-                            return df, pattern
-                        except Exception as e1:
-                            print(f"Standard pandas read_csv failed: {e1}")
-
-                        # Approach 2: Try with csv.reader to manually parse rows
-                        try:
-                            from io import StringIO
-
-                            # First, determine the dialect and separator
-                            dialect = csv.Sniffer().sniff(content[:1000])
-
-                            # Read the header row
-                            reader = csv.reader(StringIO(content), dialect)
-                            header = next(reader)
-
-                            # Read data rows, handle inconsistent column counts
-                            rows = []
-                            for row in reader:
-                                # If row is too short, pad with None values
-                                if len(row) < len(header):
-                                    row = row + [None] * (len(header) - len(row))
-                                # If row is too long, truncate to match header
-                                elif len(row) > len(header):
-                                    row = row[: len(header)]
-                                rows.append(row)
-
-                            df = pd.DataFrame(rows, columns=header)
-                            print(
-                                f"Successfully read {file_name} with csv.reader approach, shape: {df.shape}"
-                            )
-                            return df, pattern
-                        except Exception as e2:
-                            print(f"csv.reader approach failed: {e2}")
-
-                        # Approach 3: Last resort - try with low_memory=False and custom separator
-                        try:
-                            # Try different separators
-                            for sep in [",", "\t", ";"]:
-                                try:
-                                    df = pd.read_csv(
-                                        StringIO(content),
-                                        sep=sep,
-                                        engine="python",  # More flexible but slower engine
-                                        on_bad_lines="skip",
-                                        low_memory=False,
-                                        encoding_errors="ignore",
-                                    )
-                                    # If we got at least some columns and rows, consider it successful
-                                    if df.shape[0] > 0 and df.shape[1] > 0:
-                                        print(
-                                            f"Successfully read {file_name} with separator '{sep}', shape: {df.shape}"
-                                        )
-                                        return df, pattern
-                                except Exception as e:
-                                    continue
-                        except Exception as e3:
-                            print(f"All pandas approaches failed: {e3}")
-
-                        # If we got here, all approaches failed
-                        print(f"Unable to parse {file_name} with any method")
-
-                    except Exception as e:
-                        print(f"Error processing file {file_name}: {e}")
-                        continue  # Try the next matching file if there's an error
-
-            # If we've checked all files and found no match
-            print(
-                f"No file matching pattern '{patterns}' found or all matches failed parsing."
-            )
-            return None, None
+        # Process the first matching file we can parse
+        for pattern, file_name in members:
+            try:
+                if chunksize:
+                    counter = chunk_counter()
+                    reader = yield from count_linkedin_csv_chunks(
+                        archive, file_name, chunksize, columns, counter
+                    )
+                    if reader.columns:
+                        return counter, pattern
+                else:
+                    with archive.open(file_name) as csv_file:
+                        reader = CsvReader(csv_file, columns)
+                        df = reader.read()
+                    if reader.columns:
+                        print(
+                            f"Successfully read {file_name}, shape: {df.shape}, "
+                            f"skipped {reader.skipped} malformed lines"
+                        )
+                        return df, pattern
+
+                print(f"Unable to parse {file_name}: no header row")
+
+            except Exception as e:
+                print(f"Error processing file {file_name}: {e}")
+                continue  # Try the next matching file if there's an error
+
+        # If all matching files failed parsing
+        print(f"All files matching {[name for _, name in members]} failed parsing.")
+        return None, None
 
     except Exception as e:
         print(f"Error extracting LinkedIn content: {e}")
         return None, None
 
 
-def extract_youtube_content_from_zip_folder(zip_file_path, patterns):
+def iter_takeout_history(json_file):
+    """
+    Stream a Google Takeout history (watch-history.json, search-history.json)
+
+    Yields (time, has_title_url) for every entry with a time, one entry at a time
+    """
+    for entry in iter_array(json_file):
+        time_str = entry.get("time")
+        if time_str is not None:
+            yield time_str, "titleUrl" in entry
+
+
+def read_takeout_history(json_file):
+    """
+    Condense a Google Takeout history into per-day tallies while streaming it
+
+    Generator yielding the number of decompressed bytes read so far (see
+    port.progress).
+
+    Returns:
+    - DataFrame sorted by "date" (YYYY-MM-DD) with the number of entries per day
+      ("entries") and how many of them link to a video ("with_title_url")
+    """
+    entries = {}
+    with_title_url = {}
+    for count, (time_str, has_title_url) in enumerate(
+        iter_takeout_history(json_file), start=1
+    ):
+        if count % PROGRESS_ELEMENTS == 0:
+            yield json_file.tell()
+        day = time_str.split("T")[0]
+        entries[day] = entries.get(day, 0) + 1
+        if has_title_url:
+            with_title_url[day] = with_title_url.get(day, 0) + 1
+
+    days = sorted(entries)
+    return pd.DataFrame(
+        {
+            "date": days,
+            "entries": [entries[day] for day in days],
+            "with_title_url": [with_title_url.get(day, 0) for day in days],
+        }
+    )
+
+
+def extract_youtube_content_from_zip_folder(archive, members):
     """
     Extract content from YouTube data export zip file using exact filenames
+
+    Generator yielding the number of decompressed bytes read so far (see
+    port.progress), returns (content, matched pattern).
     """
     try:
-        with zipfile.ZipFile(zip_file_path, "r") as zip_ref:
-            # Get the list of file names in the zip file
-            file_names = zip_ref.namelist()
-
-            # Look for matching files
-            for pattern in patterns:
-                for file_name in file_names:
-                    if pattern in file_name:
-                        try:
-                            # Process based on file extension
-                            if file_name.endswith(".json"):
-                                with zip_ref.open(file_name) as json_file:
-                                    json_content = json_file.read()
-                                    return json.loads(json_content), pattern
-                            elif file_name.endswith(".csv"):
-                                with zip_ref.open(file_name) as csv_file:
-                                    return pd.read_csv(csv_file), pattern
-                        except Exception as e:
-                            print(f"Error reading file {file_name}: {e}")
-                            continue  # Try the next matching file if there's an error
-
-            # If we've checked all files and found no match
-            print(f"No file matching pattern '{patterns}' found")
-            return None, None
+        # Look for the first readable matching file
+        for pattern, file_name in members:
+            try:
+                # Process based on file extension
+                if file_name.endswith(".json"):
+                    # Watch and search histories are streamed into daily tallies
+                    with archive.open(file_name) as json_file:
+                        return (yield from read_takeout_history(json_file)), pattern
+                elif file_name.endswith(".csv"):
+                    with archive.open(file_name) as csv_file:
+                        return pd.read_csv(csv_file), pattern
+            except Exception as e:
+                print(f"Error reading file {file_name}: {e}")
+                continue  # Try the next matching file if there's an error
+
+        # If all matching files failed
+        print(f"No readable file found in {[name for _, name in members]}")
+        return None, None
 
     except Exception as e:
         print(f"Error extracting YouTube content: {e}")
@@ -928,8 +1136,24 @@ def prompt_extraction_message(message, percentage):
 
 
 # Main content of consent page: display all extracted data
-def prompt_consent(data, meta_data, locale, platform="Instagram"):
+def prompt_consent(
+    data,
+    meta_data,
+    locale,
+    platform="Instagram",
+    measure_output=DONATE_METRICS,
+    probe_memory=PROBE_MEMORY,
+):
+    """
+    Build the consent page of the extracted tables
+
+    With measure_output, the time and size of serializing every table are added to
+    the metrics of its entry. That serializes each table once more, so it is only
+    done when the metrics are donated.
+    """
     print(meta_data)
+    probe = MemoryProbe(probe_memory)
+    probe.start()
 
     table_list = []
 
@@ -948,8 +1172,19 @@ def prompt_consent(data, meta_data, locale, platform="Instagram"):
             # If platform is unknown, we can't process the data
             extraction_dict = {}
 
+        # Serialization times go into the metrics of the entries
+        metrics = {}
+        if measure_output:
+            metrics = {
+                record["entry"]: record
+                for record in metrics_records(meta_data)
+                if record["platform"] == platform
+            }
+
         for i, (file, description) in enumerate(extraction_dict.items()):
-            df = data[i]
+            # Day-number columns are shown as dates from here on
+            clock = time.perf_counter()
+            df = format_day_columns(data[i])
             # Check if the dataframe has only one row
             if len(df) == 1:
                 # Extract the title from the translation
@@ -959,6 +1194,7 @@ def prompt_consent(data, meta_data, locale, platform="Instagram"):
                     [f"{col}: {df.iloc[0][col]}" for col in df.columns]
                 )
                 binary_data.append([translated_title, combined_value])
+                payload = combined_value
             else:
                 # Directly add multi-row dataframes to the table list
                 table = props.PropsUIPromptConsentFormTable(
@@ -968,6 +1204,12 @@ def prompt_consent(data, meta_data, locale, platform="Instagram"):
                     df,
                 )
                 table_list.append(table)
+                payload = table.toDict()["data_frame"] if file in metrics else None
+
+            if file in metrics:
+                # What the page sends for the entry: its table as rendered by toDict
+                metrics[file]["serialize_seconds"] = time.perf_counter() - clock
+                metrics[file]["output_bytes"] = len(payload.encode("utf-8"))
 
         # Create a dataframe for binary data if there are any single-row entries
         if binary_data:
@@ -1021,6 +1263,17 @@ def prompt_consent(data, meta_data, locale, platform="Instagram"):
         ),
     )
 
+    probe.stop()
+    if probe_memory and meta_data is not None:
+        meta_data.append(
+            (
+                "metrics",
+                probe.record(
+                    {"platform": platform, "entry": None, "step": "prompt_consent"}
+                ),
+            )
+        )
+
     return blocks
 
 
@@ -0,0 +1,115 @@
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from port.api.props import Translatable
+
+############################
+# Device, OS and browser of user-agent strings
+############################
+
+# Login and device tables hold one user-agent string per event, but an account uses
+# only a handful of devices, so the same few strings repeat thousands of times.
+# classify_user_agents therefore factorizes the column first, classifies every
+# distinct agent once (classify_user_agent is memoized, so agents shared by several
+# tables are not classified again) and broadcasts the labels back to the rows as
+# categorical columns. add_device_columns replaces the user-agent column of a table
+# with these three columns: they are what the consent page shows, and a few short
+# labels serialize to far less than full user-agent strings.
+
+UNKNOWN = "Unknown"
+USER_AGENT_CACHE_SIZE = 4096  # distinct agents remembered by classify_user_agent
+
+# Titles of the device, operating system and browser columns
+DEVICE_COLUMNS = (
+    {"en": "Device", "de": "Gerät", "nl": "Apparaat"},
+    {"en": "Operating system", "de": "Betriebssystem", "nl": "Besturingssysteem"},
+    {"en": "Browser", "de": "Browser", "nl": "Browser"},
+)
+
+# (label, pattern) pairs, the first pattern found in an agent gives its label
+DEVICE_RULES = (
+    ("Bot", re.compile(r"bot|crawler|spider", re.IGNORECASE)),
+    ("Tablet", re.compile(r"iPad|Tablet|Kindle|Silk/")),
+    ("Mobile", re.compile(r"iPhone|iPod|Android|Mobile|Windows Phone|BlackBerry")),
+    ("Desktop", re.compile(r"Windows NT|Macintosh|Mac OS X|X11|Linux|CrOS")),
+)
+OS_RULES = (
+    ("Windows Phone", re.compile(r"Windows Phone")),
+    ("Windows", re.compile(r"Windows")),
+    ("iOS", re.compile(r"iPhone|iPad|iPod|\biOS\b")),
+    ("Android", re.compile(r"Android")),
+    ("Chrome OS", re.compile(r"CrOS")),
+    ("macOS", re.compile(r"Macintosh|Mac OS X")),
+    ("Linux", re.compile(r"Linux|X11")),
+)
+BROWSER_RULES = (
+    ("Instagram app", re.compile(r"Instagram")),
+    ("LinkedIn app", re.compile(r"LinkedIn|com\.linkedin", re.IGNORECASE)),
+    ("Facebook app", re.compile(r"FBAN|FBAV")),
+    ("Edge", re.compile(r"Edge?/|EdgA/|EdgiOS/")),
+    ("Opera", re.compile(r"OPR/|Opera")),
+    ("Samsung Internet", re.compile(r"SamsungBrowser")),
+    ("Firefox", re.compile(r"Firefox|FxiOS")),
+    ("Chrome", re.compile(r"Chrome|CriOS|Chromium")),
+    ("Safari", re.compile(r"Safari|AppleWebKit")),
+)
+
+
+def _first_match(rules, agent):
+    for label, pattern in rules:
+        if pattern.search(agent):
+            return label
+    return UNKNOWN
+
+
+@lru_cache(maxsize=USER_AGENT_CACHE_SIZE)
+def classify_user_agent(agent):
+    """
+    Classify a user-agent string
+
+    Returns:
+    - (device family, operating system, browser), each UNKNOWN if not recognized
+    """
+    return (
+        _first_match(DEVICE_RULES, agent),
+        _first_match(OS_RULES, agent),
+        _first_match(BROWSER_RULES, agent),
+    )
+
+
+def classify_user_agents(agents, names=("device", "os", "browser")):
+    """
+    Device family, operating system and browser of every agent in a sequence
+
+    Parameters:
+    - agents: user-agent strings, missing ones are classified as UNKNOWN
+    - names: names of the device, operating system and browser columns
+
+    Returns:
+    - DataFrame with the three categorical columns, one row per agent
+    """
+    codes, uniques = pd.factorize(pd.Series(agents, dtype=object))
+    # The extra row is picked by the code -1 of missing agents
+    labels = [classify_user_agent(str(agent)) for agent in uniques]
+    labels = np.array(labels + [(UNKNOWN,) * 3], dtype=object).reshape(-1, 3)
+    return pd.DataFrame(
+        {name: pd.Categorical(labels[codes, i]) for i, name in enumerate(names)}
+    )
+
+
+def add_device_columns(df, column, locale):
+    """
+    Replace the user-agent column of df by its device, operating system and browser
+    columns (see classify_user_agents), titled in locale. Returns a new DataFrame
+    """
+    names = [Translatable(titles).translations[locale] for titles in DEVICE_COLUMNS]
+    devices = classify_user_agents(df[column], names)
+    devices.index = df.index
+
+    position = df.columns.get_loc(column)
+    return pd.concat(
+        [df.iloc[:, :position], devices, df.iloc[:, position + 1 :]], axis=1
+    )
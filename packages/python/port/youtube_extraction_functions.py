@@ -1,5 +1,6 @@
 from port.api.assets import *
 from port.api.props import Translatable
+from port.day_histogram import count_per_day, datetimes_to_days
 import pandas as pd
 from datetime import datetime, timezone, timedelta
 import re
@@ -59,8 +60,12 @@ def translate(value, locale, dummy_decider=None):
 ############################
 
 
-def extract_watch_history(watch_history_json, locale):
-    """Extract YouTube watch history"""
+def extract_watch_history(watch_history_df, locale):
+    """Extract YouTube watch history
+
+    watch_history_df holds the daily tallies of the streamed history, see
+    read_takeout_history
+    """
 
     tl_date = translate("date", locale)
     tl_value = translate(
@@ -72,21 +77,15 @@ def extract_watch_history(watch_history_json, locale):
         locale,
     )
 
-    # Initialize list to store dates
-    dates = []
-
-    # Process each entry in the watch history
-    for entry in watch_history_json:
-        if "time" in entry and "titleUrl" in entry:  # Make sure it's a video entry
-            # Extract date (YYYY-MM-DD) from ISO timestamp
-            date_str = entry["time"].split("T")[0]
-            dates.append(date_str)
+    # Only entries linking to a video count as watched videos
+    watched = watch_history_df[watch_history_df["with_title_url"] > 0]
 
-    # Create DataFrame with dates
-    dates_df = pd.DataFrame(dates, columns=[tl_date])
-
-    # Aggregate by date to count videos watched per day
-    aggregated_df = dates_df.groupby(tl_date).size().reset_index(name=tl_value)
+    aggregated_df = pd.DataFrame(
+        {
+            tl_date: watched["date"].tolist(),
+            tl_value: watched["with_title_url"].tolist(),
+        }
+    )
 
     return aggregated_df
 
@@ -122,23 +121,11 @@ def extract_comments(comments_csv, locale):
             }
         )
 
-    # Convert dates to a consistent format
-    comments_csv[date_column] = pd.to_datetime(
-        comments_csv[date_column], errors="coerce"
-    )
-    # Extract just the date portion (without time)
-    comments_csv["formatted_date"] = comments_csv[date_column].dt.strftime("%Y-%m-%d")
-
-    # Remove entries with NaT values
-    comments_csv = comments_csv.dropna(subset=["formatted_date"])
+    # Day of each comment, entries that are not dates are dropped
+    days = datetimes_to_days(pd.to_datetime(comments_csv[date_column], errors="coerce"))
 
     # Count comments per day
-    daily_counts = (
-        comments_csv.groupby("formatted_date").size().reset_index(name=tl_value)
-    )
-    daily_counts.rename(columns={"formatted_date": tl_date}, inplace=True)
-
-    return daily_counts
+    return count_per_day(days, "%Y-%m-%d", tl_date, tl_value)
 
 
 def extract_subscriptions(subscriptions_csv, locale):
@@ -165,8 +152,12 @@ def extract_subscriptions(subscriptions_csv, locale):
     return subscriptions_df
 
 
-def extract_search_history(search_history_json, locale):
-    """Extract YouTube search history and count per day"""
+def extract_search_history(search_history_df, locale):
+    """Extract YouTube search history and count per day
+
+    search_history_df holds the daily tallies of the streamed history, see
+    read_takeout_history
+    """
 
     tl_date = translate("date", locale)
     tl_value = translate(
@@ -178,17 +169,7 @@ def extract_search_history(search_history_json, locale):
         locale,
     )
 
-    # Initialize list to store dates
-    dates = []
-
-    # Process each entry in the search history
-    for entry in search_history_json:
-        if "time" in entry:  # Make sure it has a timestamp
-            # Extract date (YYYY-MM-DD) from ISO timestamp
-            date_str = entry["time"].split("T")[0]
-            dates.append(date_str)
-
-    if not dates:
+    if search_history_df.empty:
         return pd.DataFrame(
             {
                 tl_date: ["N/A"],
@@ -196,10 +177,11 @@ def extract_search_history(search_history_json, locale):
             }
         )
 
-    # Create DataFrame with dates
-    dates_df = pd.DataFrame(dates, columns=[tl_date])
-
-    # Aggregate by date to count searches per day
-    aggregated_df = dates_df.groupby(tl_date).size().reset_index(name=tl_value)
+    aggregated_df = pd.DataFrame(
+        {
+            tl_date: search_history_df["date"].tolist(),
+            tl_value: search_history_df["entries"].tolist(),
+        }
+    )
 
     return aggregated_df
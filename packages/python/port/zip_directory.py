@@ -0,0 +1,322 @@
+import io
+import struct
+import time
+import zipfile
+
+############################
+# Lean central-directory reader
+############################
+
+# Instagram and Takeout exports hold tens of thousands of photos and videos.
+# zipfile.ZipFile builds a ZipInfo object (decoding names and extra fields) for every
+# one of them. ZipDirectory reads the central directory in one block, looks only at
+# the raw name of each record and keeps the few members with a relevant extension.
+# Members are opened with zipfile's own decompressing reader (ZipExtFile), which
+# adds the time it spends reading and decompressing to its ZipDirectory.
+
+# Data files read or checked by any platform
+RELEVANT_EXTENSIONS = (".json", ".csv", ".html")
+
+_EOCD = struct.Struct("<4s4H2LH")
+_EOCD_SIGNATURE = b"PK\x05\x06"
+_EOCD64_LOCATOR = struct.Struct("<4sLQL")
+_EOCD64_LOCATOR_SIGNATURE = b"PK\x06\x07"
+_EOCD64 = struct.Struct("<4sQ2H2L4Q")
+_EOCD64_SIGNATURE = b"PK\x06\x06"
+_CENTRAL_HEADER = struct.Struct("<4s4B4HL2L5H2L")
+_CENTRAL_HEADER_SIGNATURE = b"PK\x01\x02"
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+
+_FLAG_ENCRYPTED = 0x1
+_FLAG_UTF8 = 0x800
+_ZIP64_EXTRA = 0x0001
+_MAX_COMMENT = 0xFFFF
+
+
+class MemberInfo:
+    """The central-directory fields needed to open a member
+
+    Compatible with the attributes zipfile.ZipExtFile reads from a ZipInfo.
+    """
+
+    __slots__ = (
+        "filename",
+        "header_offset",
+        "compress_type",
+        "compress_size",
+        "file_size",
+        "CRC",
+        "flag_bits",
+    )
+
+    def __init__(
+        self,
+        filename,
+        header_offset,
+        compress_type,
+        compress_size,
+        file_size,
+        CRC,
+        flag_bits,
+    ):
+        self.filename = filename
+        self.header_offset = header_offset
+        self.compress_type = compress_type
+        self.compress_size = compress_size
+        self.file_size = file_size
+        self.CRC = CRC
+        self.flag_bits = flag_bits
+
+    def is_dir(self):
+        return self.filename.endswith("/")
+
+
+class _MemberStream:
+    """View on the shared archive file with its own position, read by ZipExtFile"""
+
+    __slots__ = "_file", "_pos"
+
+    def __init__(self, file, pos):
+        self._file = file
+        self._pos = pos
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence != io.SEEK_SET:
+            raise ValueError("member streams only seek from the start or position")
+        self._pos = offset
+        return offset
+
+    def read(self, n=-1):
+        self._file.seek(self._pos)
+        data = self._file.read(n)
+        self._pos += len(data)
+        return data
+
+    def close(self):
+        pass
+
+
+class _TimedZipExtFile(zipfile.ZipExtFile):
+    """ZipExtFile adding the time spent reading and decompressing to its directory
+
+    Only the public reading methods are timed. They call each other (peek and
+    readline read through read), so only the outermost call is counted.
+    """
+
+    def __init__(self, fileobj, mode, info, directory):
+        super().__init__(fileobj, mode, info)
+        self._directory = directory
+        self._timing = False
+
+    def _timed(self, method, *args):
+        if self._timing:
+            return method(*args)
+        self._timing = True
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._timing = False
+            self._directory.read_seconds += time.perf_counter() - start
+
+    def read(self, n=-1):
+        return self._timed(super().read, n)
+
+    def read1(self, n):
+        return self._timed(super().read1, n)
+
+    def peek(self, n=1):
+        return self._timed(super().peek, n)
+
+    def readline(self, limit=-1):
+        return self._timed(super().readline, limit)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._timed(super().seek, offset, whence)
+
+
+def _read_at(file, offset, size):
+    file.seek(offset)
+    data = file.read(size)
+    if len(data) != size:
+        raise zipfile.BadZipFile("Truncated file")
+    return data
+
+
+def _find_central_directory(file):
+    """Return (offset, size, record count, concat) of the central directory
+
+    concat is the number of bytes prepended to the archive (e.g. self-extractors),
+    added to every offset stored in the archive.
+    """
+    file_size = file.seek(0, io.SEEK_END)
+    tail_size = min(file_size, _EOCD.size + _MAX_COMMENT)
+    tail = _read_at(file, file_size - tail_size, tail_size)
+
+    # The last record whose comment ends the file, else the last complete record
+    position = -1
+    candidate = tail.rfind(_EOCD_SIGNATURE)
+    while candidate >= 0:
+        if candidate + _EOCD.size <= len(tail):
+            comment_length = _EOCD.unpack_from(tail, candidate)[7]
+            if candidate + _EOCD.size + comment_length == len(tail):
+                position = candidate
+                break
+            if position < 0:
+                position = candidate
+        candidate = tail.rfind(_EOCD_SIGNATURE, 0, candidate)
+    if position < 0:
+        raise zipfile.BadZipFile("File is not a zip file")
+
+    eocd_offset = file_size - tail_size + position
+    _, _, _, _, count, cd_size, cd_offset, _ = _EOCD.unpack_from(tail, position)
+    records_size = _EOCD.size
+
+    if eocd_offset >= _EOCD64_LOCATOR.size:
+        locator = _read_at(
+            file, eocd_offset - _EOCD64_LOCATOR.size, _EOCD64_LOCATOR.size
+        )
+        signature, _, eocd64_offset, _ = _EOCD64_LOCATOR.unpack(locator)
+        if signature == _EOCD64_LOCATOR_SIGNATURE:
+            eocd64_position = eocd_offset - _EOCD64_LOCATOR.size - _EOCD64.size
+            if eocd64_position < 0:
+                raise zipfile.BadZipFile("Corrupt ZIP64 end of central directory")
+            record = _EOCD64.unpack(_read_at(file, eocd64_position, _EOCD64.size))
+            if record[0] != _EOCD64_SIGNATURE:
+                raise zipfile.BadZipFile("Corrupt ZIP64 end of central directory")
+            count, cd_size, cd_offset = record[7], record[8], record[9]
+            records_size += _EOCD64_LOCATOR.size + _EOCD64.size
+
+    concat = eocd_offset + _EOCD.size - records_size - cd_size - cd_offset
+    if concat < 0:
+        raise zipfile.BadZipFile("Bad offset for central directory")
+    return cd_offset + concat, cd_size, count, concat
+
+
+def _zip64_values(extra, file_size, compress_size, header_offset):
+    """Replace the 0xFFFFFFFF placeholders with the values from the ZIP64 extra field"""
+    position = 0
+    while position + 4 <= len(extra):
+        field_id, length = struct.unpack_from("<2H", extra, position)
+        position += 4
+        if field_id == _ZIP64_EXTRA:
+            values = iter(
+                struct.unpack_from(f"<{min(length // 8, 3)}Q", extra, position)
+            )
+            try:
+                if file_size == 0xFFFFFFFF:
+                    file_size = next(values)
+                if compress_size == 0xFFFFFFFF:
+                    compress_size = next(values)
+                if header_offset == 0xFFFFFFFF:
+                    header_offset = next(values)
+            except StopIteration:
+                raise zipfile.BadZipFile("Corrupt extra field 0001 (ZIP64)")
+            break
+        position += length
+    return file_size, compress_size, header_offset
+
+
+class ZipDirectory:
+    """Read-only zip archive that only indexes members with relevant extensions
+
+    Attributes:
+        total: number of members in the archive, relevant or not
+        names: names of the indexed members, in archive order
+        read_seconds: time spent reading and decompressing members
+    """
+
+    __slots__ = "_file", "_members", "names", "total", "read_seconds"
+
+    def __init__(self, file, extensions=RELEVANT_EXTENSIONS):
+        """
+        Parameters:
+        - file: seekable binary file of the archive, raises zipfile.BadZipFile if it
+          is not a zip file
+        - extensions: only members ending with one of these (any case) are indexed
+        """
+        self._file = file
+        self._members = {}
+        self.names = []
+        self.read_seconds = 0.0
+
+        suffixes = tuple(extension.lower().encode("ascii") for extension in extensions)
+        cd_offset, cd_size, self.total, concat = _find_central_directory(file)
+        directory = _read_at(file, cd_offset, cd_size)
+
+        position = 0
+        unpack_from = _CENTRAL_HEADER.unpack_from
+        header_size = _CENTRAL_HEADER.size
+        for _ in range(self.total):
+            try:
+                record = unpack_from(directory, position)
+            except struct.error:
+                raise zipfile.BadZipFile("Truncated central directory")
+            if record[0] != _CENTRAL_HEADER_SIGNATURE:
+                raise zipfile.BadZipFile("Bad magic number for central directory")
+            name_length, extra_length, comment_length = record[12:15]
+            name_start = position + header_size
+            position = name_start + name_length + extra_length + comment_length
+
+            raw_name = directory[name_start : name_start + name_length]
+            if not raw_name.lower().endswith(suffixes):
+                continue
+
+            flag_bits = record[5]
+            encoding = "utf-8" if flag_bits & _FLAG_UTF8 else "cp437"
+            file_size, compress_size, header_offset = record[11], record[10], record[18]
+            if 0xFFFFFFFF in (file_size, compress_size, header_offset):
+                extra_start = name_start + name_length
+                file_size, compress_size, header_offset = _zip64_values(
+                    directory[extra_start : extra_start + extra_length],
+                    file_size,
+                    compress_size,
+                    header_offset,
+                )
+
+            name = raw_name.decode(encoding)
+            self.names.append(name)
+            self._members[name] = MemberInfo(
+                name,
+                header_offset + concat,
+                record[6],
+                compress_size,
+                file_size,
+                record[9],
+                flag_bits,
+            )
+
+    def infolist(self):
+        return [self._members[name] for name in self.names]
+
+    def getinfo(self, name):
+        try:
+            return self._members[name]
+        except KeyError:
+            raise KeyError(f"There is no item named {name!r} in the archive")
+
+    def open(self, name):
+        """Return a zipfile.ZipExtFile reading the decompressed member"""
+        info = self.getinfo(name)
+        if info.flag_bits & _FLAG_ENCRYPTED:
+            raise RuntimeError(f"File {name!r} is encrypted, password required")
+
+        header = _read_at(self._file, info.header_offset, _LOCAL_HEADER.size)
+        header = _LOCAL_HEADER.unpack(header)
+        if header[0] != _LOCAL_HEADER_SIGNATURE:
+            raise zipfile.BadZipFile("Bad magic number for file header")
+        data_offset = info.header_offset + _LOCAL_HEADER.size + header[10] + header[11]
+
+        return _TimedZipExtFile(_MemberStream(self._file, data_offset), "r", info, self)
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,62 @@
+import io
+
+from port.block_file import BlockFile, CountingFile
+
+DATA = bytes(range(256)) * 40  # 10240 bytes, 10 blocks of 1024
+
+
+def open_block_file(cache_blocks=4):
+    counter = CountingFile(io.BytesIO(DATA))
+    return BlockFile(counter, block_size=1024, cache_blocks=cache_blocks), counter
+
+
+def test_small_reads_within_a_block_read_it_once():
+    block_file, counter = open_block_file()
+    for offset in range(0, 1024, 16):
+        block_file.seek(offset)
+        assert block_file.read(16) == DATA[offset : offset + 16]
+    assert counter.reads == 1
+    assert counter.bytes_read == 1024
+
+
+def test_read_across_blocks():
+    block_file, counter = open_block_file()
+    block_file.seek(1000)
+    assert block_file.read(100) == DATA[1000:1100]
+    assert counter.reads == 2
+    assert block_file.tell() == 1100
+
+
+def test_large_aligned_read_bypasses_the_cache():
+    block_file, counter = open_block_file()
+    assert block_file.read(4096 + 10) == DATA[: 4096 + 10]
+    # Four whole blocks in one read, the rest through the cached fifth block
+    assert counter.reads == 2
+    assert counter.bytes_read == 4096 + 1024
+
+
+def test_evicted_blocks_are_read_again():
+    block_file, counter = open_block_file(cache_blocks=2)
+    for offset in (0, 1024, 2048, 0):
+        block_file.seek(offset)
+        block_file.read(1)
+    assert counter.reads == 4
+
+    block_file.seek(2048)
+    block_file.read(1)
+    assert counter.reads == 4
+
+
+def test_read_to_end_and_past_it():
+    block_file, counter = open_block_file()
+    block_file.seek(-10, io.SEEK_END)
+    assert block_file.read() == DATA[-10:]
+    assert block_file.read(10) == b""
+    block_file.seek(len(DATA) + 5)
+    assert block_file.read(1) == b""
+
+
+def test_close_closes_the_underlying_file():
+    block_file, counter = open_block_file()
+    block_file.close()
+    assert counter.closed
@@ -0,0 +1,137 @@
+import io
+
+import pandas as pd
+import pytest
+
+from port.csv_stream import MAX_RECORD_LINES, CsvReader, TolerantCsvReader
+
+ROWS = "".join(f"{i},message {i}\n" for i in range(100))
+CSV = "Date,Text\n" + ROWS
+
+
+def read(text, columns=None, reader_class=CsvReader):
+    reader = reader_class(io.BytesIO(text.encode("utf-8")), columns)
+    return reader.read(), reader
+
+
+def dates(df):
+    return [int(value) for value in df["Date"]]
+
+
+def test_well_formed_file_matches_pandas():
+    text = 'Date,Text,Empty\n1,"a, b",\n2,"multi\nline ""quoted""",NA\n3,plain,x\n'
+    df, reader = read(text)
+    expected = pd.read_csv(io.StringIO(text), dtype=str)
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+    assert reader.skipped == 0
+    assert reader.rows == 3
+
+
+def test_short_rows_are_padded():
+    df, reader = read("Date,Text,Extra\n1,a\n2\n\n3,c,x\n")
+    assert df["Date"].tolist() == ["1", "2", "3"]
+    assert df["Text"].isna().tolist() == [False, True, False]
+    assert reader.skipped == 0
+
+
+@pytest.mark.parametrize("extra", [0, 5, 99])
+def test_rows_with_extra_fields_are_skipped_and_counted(extra):
+    df, reader = read(CSV.replace(f"{extra},message {extra}\n", f"{extra},m,extra\n"))
+    assert dates(df) == [i for i in range(100) if i != extra]
+    assert list(df.columns) == ["Date", "Text"]
+    assert df.index.tolist() == list(range(99))
+    assert reader.skipped == 1
+
+
+@pytest.mark.parametrize("broken", [10, 50, 99])
+def test_unclosed_quote_loses_only_its_line(broken):
+    text = CSV.replace(f"{broken},message {broken}\n", f'{broken},"never closed\n')
+    df, reader = read(text)
+    assert dates(df) == [i for i in range(100) if i != broken]
+    assert reader.skipped == 1
+
+
+def test_unclosed_quote_before_another_quoted_field():
+    # pandas reads lines 10 to 20 as one row, only the tolerant reader finds the quote
+    text = CSV.replace("10,message 10\n", '10,"never closed\n').replace(
+        "20,message 20\n", '20,"quoted"\n'
+    )
+    df, reader = read(text, reader_class=TolerantCsvReader)
+    assert 10 not in dates(df)
+    assert 20 in dates(df)
+    assert len(df) == 99
+    assert reader.skipped == 1
+
+
+def test_quoted_field_spanning_too_many_lines():
+    long_field = "\n".join(["line"] * (MAX_RECORD_LINES + 5))
+    text = f'Date,Text\n1,"{long_field}"\n2,b\n'
+    df, reader = read(text, reader_class=TolerantCsvReader)
+    assert dates(df) == [2]
+    assert reader.skipped == MAX_RECORD_LINES + 5
+
+
+@pytest.mark.parametrize("reader_class", [CsvReader, TolerantCsvReader])
+def test_short_rows_spanning_lines_are_padded(reader_class):
+    df, reader = read('a,b,c\n1,"multi\nline"\n2,x,y\n', reader_class=reader_class)
+    assert df["a"].tolist() == ["1", "2"]
+    assert df["b"].tolist() == ["multi\nline", "x"]
+    assert df["c"].isna().tolist() == [True, False]
+    assert reader.skipped == 0
+
+
+def test_stray_quotes_inside_fields_are_kept():
+    df, reader = read('Date,Text\n1,say "hi"\n2,5" screen\n')
+    assert df["Text"].tolist() == ['say "hi"', '5" screen']
+    assert reader.skipped == 0
+
+
+@pytest.mark.parametrize("delimiter", [";", "\t"])
+def test_delimiter_from_header(delimiter):
+    df, _ = read(f"Date{delimiter}Text\n1{delimiter}a, b\n")
+    assert df.to_dict("list") == {"Date": ["1"], "Text": ["a, b"]}
+
+
+def test_notes_preamble_and_byte_order_mark():
+    df, _ = read("\ufeffNotes:\nSome text, with commas\n\nFirst Name,Last Name\nA,B\n")
+    assert df.to_dict("list") == {"First Name": ["A"], "Last Name": ["B"]}
+    df, _ = read("\ufeffDate,Text\n1,a\n")
+    assert list(df.columns) == ["Date", "Text"]
+
+
+def test_column_selection():
+    df, _ = read("DATE,FROM,CONTENT\n1,a,hello\n", ["date", "from"])
+    assert list(df.columns) == ["DATE", "FROM"]
+    # If no column matches, all are read
+    df, _ = read("DATE,FROM,CONTENT\n1,a,hello\n", ["sender"])
+    assert list(df.columns) == ["DATE", "FROM", "CONTENT"]
+
+
+def test_column_selection_of_rows_with_extra_fields():
+    # Only parsing some columns, pandas takes them by position
+    df, reader = read("DATE,FROM,CONTENT\n1,a,hello\n2,b,hi,there\n", ["date"])
+    assert df.to_dict("list") == {"DATE": ["1", "2"]}
+    assert reader.skipped == 0
+
+
+def test_empty_files():
+    df, reader = read("")
+    assert reader.columns == [] and df.empty
+    df, reader = read("Date,Text\n")
+    assert list(df.columns) == ["Date", "Text"] and df.empty
+
+
+def test_chunks_continue_the_index_and_count_skipped_lines():
+    text = CSV.replace("70,message 70\n", '70,"never closed\n')
+    reader = CsvReader(io.BytesIO(text.encode()))
+    chunks = list(reader.chunks(30))
+    assert [len(chunk) for chunk in chunks] == [30, 30, 30, 9]
+    df = pd.concat(chunks)
+    assert df.index.tolist() == list(range(99))
+    assert dates(df) == [i for i in range(100) if i != 70]
+    assert reader.skipped == 1
+
+
+def test_chunks_of_a_file_without_rows():
+    reader = CsvReader(io.BytesIO(b"Date,Text\n"))
+    assert [list(chunk.columns) for chunk in reader.chunks(10)] == [["Date", "Text"]]
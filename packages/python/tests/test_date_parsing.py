@@ -0,0 +1,83 @@
+import pandas as pd
+import pytest
+
+from port import date_parsing
+from port.date_parsing import infer_date_format, parse_dates, reset_date_formats
+
+KEY = ("Connections.csv", "Connected On")
+
+
+@pytest.fixture(autouse=True)
+def fresh_formats():
+    reset_date_formats()
+    yield
+    reset_date_formats()
+
+
+def test_infers_the_linkedin_formats():
+    assert infer_date_format(pd.Series(["8/22/24, 10:54 PM"])) == "%m/%d/%y, %I:%M %p"
+    assert infer_date_format(pd.Series(["22 Aug 2024", None])) == "%d %b %Y"
+    assert infer_date_format(pd.Series(["2024-08-22 22:54:00 UTC"])) == (
+        "%Y-%m-%d %H:%M:%S UTC"
+    )
+    assert infer_date_format(pd.Series(["not a date"])) is None
+
+
+def test_matches_generic_parsing():
+    values = pd.Series(["8/22/24, 10:54 PM", "1/2/23, 9:05 AM", None, "", "garbage"])
+    expected = pd.to_datetime(values, errors="coerce")
+    pd.testing.assert_series_equal(parse_dates(values), expected)
+
+
+def test_rows_in_another_format_fall_back_to_generic_parsing():
+    values = pd.Series(["2024-08-22", "2024-08-23", "Aug 24, 2024"])
+    assert parse_dates(values).tolist() == [
+        pd.Timestamp("2024-08-22"),
+        pd.Timestamp("2024-08-23"),
+        pd.Timestamp("2024-08-24"),
+    ]
+
+
+def test_format_is_cached_per_key(monkeypatch):
+    parse_dates(pd.Series(["22 Aug 2024"]), KEY)
+    assert date_parsing._formats == {KEY: "%d %b %Y"}
+
+    inferred = []
+    monkeypatch.setattr(
+        date_parsing,
+        "infer_date_format",
+        lambda values: inferred.append(values) or "%Y-%m-%d",
+    )
+    assert parse_dates(pd.Series(["23 Aug 2024"]), KEY).tolist() == [
+        pd.Timestamp("2024-08-23")
+    ]
+    assert inferred == []
+
+    parse_dates(pd.Series(["2024-08-23"]))  # no key, nothing cached
+    assert date_parsing._formats == {KEY: "%d %b %Y"}
+
+
+def test_chunk_without_dates_does_not_fix_the_format():
+    empty = parse_dates(pd.Series([None, ""], dtype=object), KEY)
+    assert empty.isna().all()
+    assert KEY not in date_parsing._formats
+
+    parsed = parse_dates(pd.Series(["8/22/24, 10:54 PM"]), KEY)
+    assert parsed.tolist() == [pd.Timestamp("2024-08-22 22:54")]
+    assert date_parsing._formats[KEY] == "%m/%d/%y, %I:%M %p"
+
+
+def test_reset_forgets_formats():
+    parse_dates(pd.Series(["22 Aug 2024"]), KEY)
+    reset_date_formats()
+    assert date_parsing._formats == {}
+
+
+def test_time_zones_are_dropped():
+    values = pd.Series(["2024-08-22T10:00:00+02:00", "2024-08-22T10:00:00+00:00"])
+    parsed = parse_dates(values)
+    assert parsed.dt.tz is None
+    assert parsed.tolist() == [
+        pd.Timestamp("2024-08-22 08:00"),
+        pd.Timestamp("2024-08-22 10:00"),
+    ]
@@ -0,0 +1,84 @@
+import io
+import json
+
+import pytest
+
+from port.json_stream import iter_array
+
+ELEMENTS = [
+    {"title": "café ☕ 🎉", "timestamp": 1700000000, "nested": {"list": [1, 2.5, -3e2]}},
+    1234567890123,
+    -0.000125,
+    'quote " and backslash \\',
+    None,
+    True,
+    [],
+    {},
+]
+
+# Small chunks cut numbers, strings and multi-byte characters at chunk boundaries
+CHUNK_SIZES = [1, 2, 3, 7, 64, 1 << 16]
+
+
+def stream(document, prefix=b""):
+    return io.BytesIO(prefix + json.dumps(document, ensure_ascii=False).encode())
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_top_level_array(chunk_size):
+    assert list(iter_array(stream(ELEMENTS), chunk_size=chunk_size)) == ELEMENTS
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_array_under_key_with_header(chunk_size):
+    document = {
+        "participants": [{"name": "a"}, {"name": "b"}],
+        "title": "chat",
+        "messages": ELEMENTS,
+        "after": "ignored",
+    }
+    header = {}
+    elements = list(
+        iter_array(stream(document), "messages", chunk_size=chunk_size, header=header)
+    )
+    assert elements == ELEMENTS
+    assert header == {"participants": document["participants"], "title": "chat"}
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_number_at_end_of_document(chunk_size):
+    assert list(iter_array(io.BytesIO(b"[1, 22, 333]"), chunk_size=chunk_size)) == [
+        1,
+        22,
+        333,
+    ]
+
+
+def test_byte_order_mark_and_whitespace():
+    data = stream(ELEMENTS, prefix="\ufeff \n\t".encode())
+    assert list(iter_array(data, chunk_size=5)) == ELEMENTS
+
+
+@pytest.mark.parametrize(
+    "document, key",
+    [
+        ([], None),
+        ({}, "items"),
+        ({"other": [1, 2]}, "items"),
+        ({"items": "not an array"}, "items"),
+        ({"items": []}, "items"),
+    ],
+)
+def test_nothing_to_yield(document, key):
+    assert list(iter_array(stream(document), key, chunk_size=3)) == []
+
+
+def test_value_larger_than_chunk():
+    elements = ["x" * 10000, {"y": "z" * 5000}]
+    assert list(iter_array(stream(elements), chunk_size=16)) == elements
+
+
+@pytest.mark.parametrize("data", [b"[1, 2", b"[1 2]", b'{"items" [1]}', b""])
+def test_invalid_documents(data):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_array(io.BytesIO(data), "items" if data.startswith(b"{") else None))
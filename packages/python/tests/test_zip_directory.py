@@ -0,0 +1,109 @@
+import io
+import zipfile
+
+import pytest
+
+from port.zip_directory import ZipDirectory
+
+MEMBERS = {
+    "data/posts_viewed.json": b'{"impressions_history_posts_seen": []}' * 20,
+    "data/Connections.CSV": b"First Name,Last Name\nA,B\n" * 20,
+    "media/photo.jpg": b"\xff\xd8" * 500,
+    "index.html": b"<html></html>",
+    "data/": b"",
+    "stored.json": b"[1, 2, 3]",
+}
+
+
+def build_zip(members=MEMBERS):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            compression = zipfile.ZIP_STORED if name == "stored.json" else None
+            archive.writestr(name, data, compress_type=compression)
+    return buffer.getvalue()
+
+
+def assert_matches_zipfile(data, extensions=(".json", ".csv", ".html")):
+    directory = ZipDirectory(io.BytesIO(data), extensions)
+    reference = zipfile.ZipFile(io.BytesIO(data))
+
+    expected = [
+        info
+        for info in reference.infolist()
+        if info.filename.lower().endswith(extensions)
+    ]
+    assert directory.total == len(reference.infolist())
+    assert directory.names == [info.filename for info in expected]
+
+    for info in expected:
+        member = directory.getinfo(info.filename)
+        assert member.header_offset == info.header_offset
+        assert member.file_size == info.file_size
+        assert member.compress_size == info.compress_size
+        assert member.CRC == info.CRC
+        with directory.open(info.filename) as stream:
+            assert stream.read() == reference.read(info.filename)
+    return directory
+
+
+def test_indexes_relevant_extensions_only():
+    directory = assert_matches_zipfile(build_zip())
+    assert "media/photo.jpg" not in directory.names
+    assert "data/Connections.CSV" in directory.names  # extensions ignore case
+    with pytest.raises(KeyError):
+        directory.getinfo("media/photo.jpg")
+
+
+def test_custom_extensions():
+    directory = assert_matches_zipfile(build_zip(), extensions=(".jpg",))
+    assert directory.names == ["media/photo.jpg"]
+
+
+def test_prepended_bytes():
+    # Self-extracting archives and the like put data before the first member
+    assert_matches_zipfile(b"#!stub\n" * 100 + build_zip())
+
+
+def with_comment(data, comment):
+    buffer = io.BytesIO(data)
+    with zipfile.ZipFile(buffer, "a") as archive:
+        archive.comment = comment
+    return buffer.getvalue()
+
+
+def test_archive_comment():
+    assert_matches_zipfile(with_comment(build_zip(), b"exported archive"))
+
+
+def test_signature_in_archive_comment():
+    # zipfile itself takes the signature in the comment for the end record
+    data = with_comment(build_zip(), b"PK\x05\x06 looks like a signature")
+    directory = ZipDirectory(io.BytesIO(data))
+    assert directory.names == ZipDirectory(io.BytesIO(build_zip())).names
+
+
+def test_zip64(monkeypatch):
+    # Lower zipfile's limits so that a small archive is written with ZIP64 sizes,
+    # offsets and end of central directory records
+    monkeypatch.setattr(zipfile, "ZIP64_LIMIT", 64)
+    monkeypatch.setattr(zipfile, "ZIP_FILECOUNT_LIMIT", 2)
+    data = build_zip()
+    monkeypatch.undo()
+
+    assert b"PK\x06\x06" in data
+    assert_matches_zipfile(data)
+    assert_matches_zipfile(b"\0" * 37 + data)
+
+
+def test_timing_is_accumulated():
+    directory = ZipDirectory(io.BytesIO(build_zip()))
+    with directory.open("data/posts_viewed.json") as stream:
+        stream.readline()
+        stream.read()
+    assert directory.read_seconds > 0
+
+
+def test_not_a_zip_file():
+    with pytest.raises(zipfile.BadZipFile):
+        ZipDirectory(io.BytesIO(b"not a zip file" * 100))